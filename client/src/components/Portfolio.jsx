@@ -12,6 +12,8 @@ const Portfolio = () => {
         const token = localStorage.getItem('token');
         const response = await axios.get(`${host}/api/portfolio`, {
           headers: { 'x-access-token': token },
+          // Sends the server's read-your-writes cookie across origins
+          withCredentials: true,
         });
         setPortfolio(response.data);
       } catch (error) {
@@ -25,6 +25,7 @@ const StockPicker = () => {
     try {
       const response = await fetch(`${host}/api/stocks`, {
         headers: { 'x-access-token': token },
+        credentials: 'include',
       });
 
       if (!response.ok) throw new Error('Failed to fetch stocks');
@@ -47,6 +48,7 @@ const StockPicker = () => {
     try {
       const response = await fetch(`${host}/api/historical/${symbol}`, {
         headers: { 'x-access-token': token },
+        credentials: 'include',
       });
 
       if (!response.ok) throw new Error('Failed to fetch historical data');
@@ -76,6 +78,7 @@ const StockPicker = () => {
             'x-access-token': token,
           },
           body: JSON.stringify({ symbol, latest_price: latestPrice }),
+          credentials: 'include',
         });
       }
     } catch (error) {
@@ -125,6 +128,7 @@ const StockPicker = () => {
           'x-access-token': token,
         },
         body: JSON.stringify(tradeData),
+        credentials: 'include',
       });
 
       if (!response.ok) throw new Error('Trade execution failed');
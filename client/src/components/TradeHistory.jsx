@@ -13,6 +13,8 @@ const TradeHistory = () => {
         // Updated route to match the current resource-based route structure
         const response = await axios.get(`${host}/api/trades`, {
           headers: { 'x-access-token': token },
+          // Sends the server's read-your-writes cookie across origins
+          withCredentials: true,
         });
         setTrades(response.data);
       } catch (error) {
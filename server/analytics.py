@@ -0,0 +1,283 @@
+# Standard library imports
+import os
+import threading
+import warnings
+from datetime import timedelta
+
+# Remote library imports
+import numpy as np
+from cachetools import TTLCache
+from sqlalchemy import bindparam, select, update
+
+# Local imports
+from config import db
+from models import Stock, Portfolio, PriceBar
+from price_bars import last_session, utc_today
+
+TRADING_DAYS = 252
+LOOKBACK_DAYS = 365
+BENCHMARK = 'SPY'
+RISK_FREE_RATE = float(os.getenv("RISK_FREE_RATE", 0.01))
+
+# Bars only change when a session closes, so both caches are keyed by the
+# last completed session: (session, symbol) -> (dates, returns) and
+# (session, symbols) -> (covariance, correlation). A series without a bar for
+# that session is not cached, since its bars may not be ingested yet.
+return_cache = TTLCache(maxsize=4096, ttl=24 * 60 * 60)
+covariance_cache = TTLCache(maxsize=256, ttl=24 * 60 * 60)
+_cache_lock = threading.Lock()
+
+
+def load_closes(symbols, start):
+    """Load daily closes since start as a (dates x symbols) matrix.
+
+    Missing days are forward-filled; days before a symbol's first bar stay NaN.
+    Returns (dates, closes) with columns in the order of symbols.
+    """
+    symbols = list(symbols)
+    rows = db.session.execute(
+        select(PriceBar.symbol, PriceBar.date, PriceBar.close)
+        .where(PriceBar.symbol.in_(symbols), PriceBar.date >= start)
+    ).all()
+    if not rows:
+        return np.array([], dtype='datetime64[D]'), np.full((0, len(symbols)), np.nan)
+
+    row_symbols, row_dates, row_closes = zip(*rows)
+    dates, date_index = np.unique(np.array(row_dates, dtype='datetime64[D]'), return_inverse=True)
+    column = {symbol: i for i, symbol in enumerate(symbols)}
+    closes = np.full((len(dates), len(symbols)), np.nan)
+    closes[date_index, [column[symbol] for symbol in row_symbols]] = row_closes
+    return dates, forward_fill(closes)
+
+
+def forward_fill(matrix):
+    """Carry the last non-NaN value down each column."""
+    index = np.where(np.isnan(matrix), 0, np.arange(len(matrix))[:, None])
+    np.maximum.accumulate(index, axis=0, out=index)
+    return matrix[index, np.arange(matrix.shape[1])]
+
+
+def daily_returns(closes):
+    """Simple daily returns; NaN where either close is unknown."""
+    return closes[1:] / closes[:-1] - 1.0
+
+
+def risk_metrics(returns, closes, benchmark_returns=None):
+    """Annualized risk statistics for each column of a (days x series) returns matrix.
+
+    Returns a dict of 1-D arrays: volatility, sharpe_ratio, sortino_ratio,
+    max_drawdown and beta (NaN where there is not enough data).
+    """
+    daily_rf = RISK_FREE_RATE / TRADING_DAYS
+    # Series without enough history produce all-NaN slices; they are reported as None
+    with warnings.catch_warnings(), np.errstate(invalid='ignore', divide='ignore'):
+        warnings.simplefilter('ignore', RuntimeWarning)
+        mean = np.nanmean(returns, axis=0)
+        std = np.nanstd(returns, axis=0, ddof=1)
+        excess = (mean - daily_rf) * TRADING_DAYS
+        volatility = std * np.sqrt(TRADING_DAYS)
+
+        downside = np.minimum(returns - daily_rf, 0.0)
+        downside_dev = np.sqrt(np.nanmean(downside ** 2, axis=0)) * np.sqrt(TRADING_DAYS)
+
+        running_peak = np.fmax.accumulate(closes, axis=0)
+        max_drawdown = np.nanmin(closes / running_peak - 1.0, axis=0)
+
+        beta = np.full(returns.shape[1], np.nan)
+        if benchmark_returns is not None:
+            valid = ~np.isnan(returns) & ~np.isnan(benchmark_returns)[:, None]
+            n = valid.sum(axis=0)
+            r = np.where(valid, returns, 0.0)
+            b = np.where(valid, benchmark_returns[:, None], 0.0)
+            r_mean = r.sum(axis=0) / n
+            b_mean = b.sum(axis=0) / n
+            covariance = ((r - r_mean) * (b - b_mean) * valid).sum(axis=0) / (n - 1)
+            variance = (((b - b_mean) * valid) ** 2).sum(axis=0) / (n - 1)
+            beta = covariance / variance
+
+        return {
+            'volatility': volatility,
+            'sharpe_ratio': excess / volatility,
+            'sortino_ratio': excess / downside_dev,
+            'max_drawdown': max_drawdown,
+            'beta': beta,
+        }
+
+
+def stock_risk(symbols, start=None):
+    """Risk metrics per symbol, measured against the benchmark. Returns {symbol: {metric: value}}."""
+    start = start or utc_today() - timedelta(days=LOOKBACK_DAYS)
+    columns = list(dict.fromkeys(list(symbols) + [BENCHMARK]))
+    _, closes = load_closes(columns, start)
+    if len(closes) < 3:
+        return {}
+
+    returns = daily_returns(closes)
+    metrics = risk_metrics(returns, closes, returns[:, columns.index(BENCHMARK)])
+    return {
+        symbol: {name: _clean(values[i]) for name, values in metrics.items()}
+        for i, symbol in enumerate(columns) if symbol in symbols
+    }
+
+
+def portfolio_risk(holdings, start=None):
+    """Risk metrics for a value-weighted portfolio of {symbol: current_value}."""
+    start = start or utc_today() - timedelta(days=LOOKBACK_DAYS)
+    symbols = list(holdings)
+    columns = symbols + [BENCHMARK] if BENCHMARK not in symbols else symbols
+    _, closes = load_closes(columns, start)
+    total = sum(holdings.values())
+    if len(closes) < 3 or not total:
+        return None
+
+    returns = daily_returns(closes)
+    weights = np.array([holdings[symbol] / total for symbol in symbols])
+    portfolio_returns = np.nan_to_num(returns[:, :len(symbols)]) @ weights
+    portfolio_values = np.concatenate([[1.0], np.cumprod(1.0 + portfolio_returns)])
+    metrics = risk_metrics(
+        portfolio_returns[:, None], portfolio_values[:, None], returns[:, columns.index(BENCHMARK)]
+    )
+    return {name: _clean(values[0]) for name, values in metrics.items()}
+
+
+def symbol_returns(symbols, session):
+    """Daily return vectors per symbol over the lookback window ending at session.
+
+    Returns {symbol: (dates, returns)}; only symbols missing from the cache are loaded.
+    """
+    with _cache_lock:
+        cached = {symbol: return_cache.get((session, symbol)) for symbol in symbols}
+    missing = [symbol for symbol, entry in cached.items() if entry is None]
+    if missing:
+        series = {symbol: ([], []) for symbol in missing}
+        rows = db.session.execute(
+            select(PriceBar.symbol, PriceBar.date, PriceBar.close)
+            .where(PriceBar.symbol.in_(missing),
+                   PriceBar.date > session - timedelta(days=LOOKBACK_DAYS), PriceBar.date <= session)
+            .order_by(PriceBar.symbol, PriceBar.date)
+        )
+        for symbol, day, close in rows:
+            series[symbol][0].append(day)
+            series[symbol][1].append(close)
+        with _cache_lock:
+            for symbol, (days, closes) in series.items():
+                closes = np.array(closes, dtype=float)
+                entry = cached[symbol] = (np.array(days[1:], dtype='datetime64[D]'), daily_returns(closes))
+                if _complete(entry, session):
+                    return_cache[(session, symbol)] = entry
+    return cached
+
+
+def _complete(entry, session):
+    """Whether a (dates, returns) series reaches session."""
+    dates = entry[0]
+    return len(dates) > 0 and dates[-1] >= np.datetime64(session)
+
+
+def covariance(symbols, session):
+    """Annualized covariance and correlation matrices of the symbols' daily returns.
+
+    Returns are aligned on the union of their dates and each pair is measured
+    over the days both have, using matrix products rather than per-pair loops.
+    Pairs with fewer than two common days are NaN.
+    """
+    symbols = tuple(sorted(symbols))
+    with _cache_lock:
+        entry = covariance_cache.get((session, symbols))
+    if entry is not None:
+        return entry
+
+    series = symbol_returns(symbols, session)
+    dates = np.unique(np.concatenate(
+        [series[symbol][0] for symbol in symbols] + [np.array([], dtype='datetime64[D]')]
+    ))
+    returns = np.full((len(dates), len(symbols)), np.nan)
+    for i, symbol in enumerate(symbols):
+        days, values = series[symbol]
+        returns[np.searchsorted(dates, days), i] = values
+
+    valid = ~np.isnan(returns)
+    mask = valid.astype(float)
+    x = np.where(valid, returns, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        n = mask.T @ mask  # common days per pair
+        sum_i = x.T @ mask  # sum of i's returns over the days shared with j
+        sum_sq_i = (x * x).T @ mask
+        cov = (x.T @ x - sum_i * sum_i.T / n) / (n - 1)
+        var_i = (sum_sq_i - sum_i * sum_i / n) / (n - 1)
+        corr = cov / np.sqrt(var_i * var_i.T)
+    entry = (symbols, cov * TRADING_DAYS, np.clip(corr, -1.0, 1.0))
+    if all(_complete(series[symbol], session) for symbol in symbols):
+        with _cache_lock:
+            covariance_cache[(session, symbols)] = entry
+    return entry
+
+
+def portfolio_correlation(holdings, session=None):
+    """Correlation matrix and variance of a value-weighted portfolio of {symbol: current_value}."""
+    session = session or last_session(utc_today())
+    total = sum(holdings.values())
+    symbols, cov, corr = covariance(holdings, session)
+    variance = None
+    if total:
+        weights = np.array([holdings[symbol] / total for symbol in symbols])
+        held = weights != 0
+        weights, held_cov = weights[held], cov[np.ix_(held, held)]
+        # A pair without enough shared history has no covariance; counting it
+        # as zero would understate the risk, so the variance is unknown
+        if not np.isnan(held_cov).any():
+            variance = float(weights @ held_cov @ weights)
+    return {
+        'as_of': session.isoformat(),
+        'symbols': list(symbols),
+        'correlation': _clean_matrix(corr),
+        'portfolio_variance': variance,
+        'portfolio_volatility': float(np.sqrt(variance)) if variance is not None else None,
+    }
+
+
+def update_holdings_risk(start=None):
+    """Batch job: recompute per-stock risk and write it to every holding with one executemany."""
+    symbols = {
+        symbol: stock_id for symbol, stock_id in
+        db.session.query(Stock.symbol, Stock.id).join(Portfolio, Portfolio.stock_id == Stock.id).distinct()
+    }
+    results = stock_risk(list(symbols), start)
+    params = [
+        {'b_stock_id': symbols[symbol], **{f'b_{name}': value for name, value in metrics.items()}}
+        for symbol, metrics in results.items()
+    ]
+    if params:
+        table = Portfolio.__table__
+        db.session.execute(
+            update(table)
+            .where(table.c.stock_id == bindparam('b_stock_id'))
+            .values(
+                volatility=bindparam('b_volatility'),
+                sharpe_ratio=bindparam('b_sharpe_ratio'),
+                sortino_ratio=bindparam('b_sortino_ratio'),
+                max_drawdown=bindparam('b_max_drawdown'),
+                beta=bindparam('b_beta'),
+            ),
+            params
+        )
+        db.session.commit()
+    return len(params)
+
+
+def _clean(value):
+    """NaN/inf are not valid JSON; report them as missing."""
+    value = float(value)
+    return value if np.isfinite(value) else None
+
+
+def _clean_matrix(matrix):
+    return np.where(np.isfinite(matrix), matrix, None).tolist()
+
+
+if __name__ == '__main__':
+    from app import app
+
+    with app.app_context():
+        print("Computing holding risk metrics...")
+        print(f"Updated holdings for {update_holdings_risk()} stocks")
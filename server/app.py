@@ -1,76 +1,189 @@
 #!/usr/bin/env python3
 
-from flask import Flask, request, jsonify, session, make_response
+from flask import Flask, request, jsonify, session, make_response, Response, stream_with_context
 from flask_restful import Resource, Api
+from sqlalchemy import and_, or_, bindparam, func, select
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import joinedload
 from functools import wraps
-import jwt, requests, os
+import jwt, os
 from dotenv import load_dotenv
-from datetime import datetime, timedelta
+from werkzeug.http import quote_etag
+from datetime import date, datetime, timedelta
 from flask_bcrypt import generate_password_hash, check_password_hash
 from cachetools import TTLCache
 import ipdb
 
 from config import app, db
-from models import User, Stock, Portfolio, Trade, StockTicker
+from models import User, Stock, Portfolio, Trade, StockTicker, PortfolioSummary
+import historical_cache
+import price_bars
+import pricing
+import market_data
+import trade_service
+import order_book
+import portfolio_summary
+import portfolio_history
+import analytics
+import indicators
+import ticker_search
+import streaming
+import data_versions
+import ledger
+import serialization
+import database
+from db_helpers import records
 
 load_dotenv()
 
 SECRET_KEY = os.getenv("SECRET_KEY")
-RAPID_API_KEY = os.getenv("RAPIDAPI_KEY")
-RAPID_API_HOST = os.getenv("RAPID_API_HOST")
-DATABASE_URL = os.getenv("DATABASE_URL")
 
 app.config['JWT_SECRET_KEY'] = SECRET_KEY or 'your-secret-key'
-app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL
 
 api = Api(app)
-price_cache = TTLCache(maxsize=10000, ttl=300)
+api.representation('application/json')(serialization.output_json)
+
+# Column projections behind the list endpoints, built once and labelled with
+# the response keys, so rows go straight from the cursor into the encoder
+STOCKS_PROJECTION = select(Stock.id, Stock.symbol, Stock.company_name, Stock.current_price)
+PORTFOLIO_PROJECTION = (
+    select(
+        Stock.symbol.label('stock_symbol'), Portfolio.quantity, Portfolio.avg_buy_price,
+        Stock.current_price, Portfolio.current_value, Portfolio.net_profit_loss
+    )
+    .join(Stock, Portfolio.stock_id == Stock.id)
+    .where(Portfolio.user_id == bindparam('user_id'))
+)
+TRADES_PROJECTION = (
+    select(
+        Trade.id, func.coalesce(Stock.symbol, 'N/A').label('stock_symbol'), Trade.trade_type,
+        Trade.quantity, Trade.price_at_trade, Trade.net_profit, Trade.timestamp
+    )
+    .outerjoin(Stock, Trade.stock_id == Stock.id)
+    .where(Trade.user_id == bindparam('user_id'))
+    .order_by(Trade.timestamp.desc(), Trade.id.desc())
+)
+SUCCESSFUL_STOCKS_PROJECTION = (
+    select(Portfolio.stock_id, Stock.symbol, Stock.company_name, Portfolio.quantity)
+    .join(Stock, Portfolio.stock_id == Stock.id)
+    .where(Portfolio.quantity >= bindparam('threshold'))
+)
+
+@app.before_request
+def route_reads():
+    """GET requests read from the replicas (or the SQLite read pool); everything else uses the primary.
+
+    A client that wrote within the last PIN_SECONDS reads from the primary too.
+    """
+    db.session.info.clear()
+    db.session.info['read_only'] = request.method in ('GET', 'HEAD') and not database.pinned(request.cookies)
+
+@app.after_request
+def pin_writers(response):
+    """Mark clients that just wrote so their next reads see the write despite replication lag."""
+    if request.method not in ('GET', 'HEAD', 'OPTIONS'):
+        database.pin(response, secure=request.is_secure)
+    return response
+
+# User IDs deleted while tokens for them may still be valid (tokens live one hour)
+revoked_user_ids = TTLCache(maxsize=10000, ttl=60 * 60)
+
+class Principal:
+    """The caller identified by a verified token. The User row is only loaded on first use."""
+    def __init__(self, user_id, username=None):
+        self.id = user_id
+        self.username = username
+        self._user = None
+
+    @property
+    def user(self):
+        if self._user is None:
+            self._user = db.session.get(User, self.id)
+            if self._user is None:
+                revoked_user_ids[self.id] = True
+        return self._user
 
 # Token-required decorator for protected routes
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
         token = request.headers.get('x-access-token')
+        if not token and request.accept_mimetypes.best == 'text/event-stream':
+            # EventSource cannot set headers, so streams may pass the token in the query string
+            token = request.args.get('token')
         if not token:
-            return jsonify({'message': 'Token is missing!'}), 401
+            return {'message': 'Token is missing!'}, 401
 
         try:
             data = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-            current_user = User.query.get(data['user_id'])
-            if not current_user:
-                return jsonify({'message': 'User not found!'}), 404
+            if data['user_id'] in revoked_user_ids:
+                return {'message': 'User not found!'}, 404
+            current_user = Principal(data['user_id'], data.get('username'))
         except jwt.ExpiredSignatureError:
-            return jsonify({'message': 'Token has expired!'}), 401
+            return {'message': 'Token has expired!'}, 401
         except jwt.InvalidTokenError:
-            return jsonify({'message': 'Invalid token!'}), 401
+            return {'message': 'Invalid token!'}, 401
 
+        # revoked_user_ids only knows about deletions made in this process, so
+        # writes confirm the user still exists (one primary-key lookup)
+        if request.method not in ('GET', 'HEAD', 'OPTIONS') and current_user.user is None:
+            return {'message': 'User not found!'}, 404
         # Adjust to include 'current_user' explicitly as a keyword argument
         return f(*args, current_user=current_user, **kwargs)
     return decorated
 
+def conditional(*keys):
+    """Answer If-None-Match with 304 while the data_versions counters behind a response are unchanged.
+
+    The counters are read before the view runs, so a 304 costs one lookup
+    instead of the view's queries and serialization.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            current_user = kwargs.get('current_user')
+            etag = data_versions.etag(keys, current_user.id if current_user else None)
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+                response.set_etag(etag)
+                return response
+            return with_etag(f(*args, **kwargs), etag)
+        return decorated
+    return decorator
+
+def with_etag(rv, etag):
+    """Attach an ETag to a successful view return value of any of the shapes views use."""
+    if isinstance(rv, Response):
+        if rv.status_code == 200:
+            rv.set_etag(etag)
+        return rv
+    if not isinstance(rv, tuple):
+        rv = (rv, 200)
+    body, status = rv[0], rv[1]
+    if status != 200:
+        return rv
+    headers = dict(rv[2]) if len(rv) > 2 else {}
+    headers['ETag'] = quote_etag(etag)
+    return body, status, headers
+
 # Helper functions for user authentication and token creation
 def create_token(user):
     payload = {'user_id': user.id, 'username': user.username, 'exp': datetime.utcnow() + timedelta(hours=1)}
     token = jwt.encode(payload, app.config['JWT_SECRET_KEY'], algorithm="HS256")
     return token
 
+def fetch_historical_prices(symbol, start=None, end=None):
+    """Fetch daily bars from the provider, optionally limited to [start, end] epoch seconds."""
+    return [item for item in market_data.client.get_historical_prices(symbol)
+            if (start is None or item['date'] >= start) and (end is None or item['date'] <= end)]
+
 @app.route('/api/successfulStock', methods=["GET"])
+@conditional(data_versions.USERS)
 def get_successfulStock():
     threshold = request.args.get('threshold', type=float)
     if threshold is None:
         return make_response({"error": "threshold not present"}), 404
     
-    results = (Portfolio.query.options(joinedload(Portfolio.stock))).filter(Portfolio.quantity >= threshold).all()
-
-    stocks_above_threshold = [{
-        "stock_id": portfolio.stock_id,
-        "symbol": portfolio.stock.symbol,
-        "company_name": portfolio.stock.company_name,
-        "quantity": portfolio.quantity
-     } for portfolio in results]
-    
+    stocks_above_threshold = records(SUCCESSFUL_STOCKS_PROJECTION, {'threshold': threshold})
     return jsonify(stocks_above_threshold), 200
                
     
@@ -97,35 +210,41 @@ class UserResource(Resource):
     @token_required
     def get(self, current_user):
         """Retrieve current user details"""
+        user = current_user.user
+        if not user:
+            return {'message': 'User not found!'}, 404
         user_data = {
-            'id': current_user.id,
-            'first_name': current_user.first_name,
-            'last_name': current_user.last_name,
-            'username': current_user.username,
-            'email': current_user.email,
+            'id': user.id,
+            'first_name': user.first_name,
+            'last_name': user.last_name,
+            'username': user.username,
+            'email': user.email,
         }
         return user_data, 200
 
     @token_required
     def put(self, current_user):
         """Update current user details"""
+        user = current_user.user
+        if not user:
+            return {'message': 'User not found!'}, 404
         data = request.get_json()
         if 'first_name' in data:
-            current_user.first_name = data['first_name']
+            user.first_name = data['first_name']
         if 'last_name' in data:
-            current_user.last_name = data['last_name']
+            user.last_name = data['last_name']
         if 'username' in data:
             # Check if the new username is unique
-            if User.query.filter_by(username=data['username']).first() and current_user.username != data['username']:
+            if User.query.filter_by(username=data['username']).first() and user.username != data['username']:
                 return {"error": "Username already taken"}, 400
-            current_user.username = data['username']
+            user.username = data['username']
         if 'email' in data:
             # Check if the new email is unique
-            if User.query.filter_by(email=data['email']).first() and current_user.email != data['email']:
+            if User.query.filter_by(email=data['email']).first() and user.email != data['email']:
                 return {"error": "Email already in use"}, 400
-            current_user.email = data['email']
+            user.email = data['email']
         if 'password' in data:
-            current_user.password_hash = generate_password_hash(data['password']).decode('utf-8')
+            user.password_hash = generate_password_hash(data['password']).decode('utf-8')
         
         try:
             db.session.commit()
@@ -137,10 +256,19 @@ class UserResource(Resource):
     @token_required
     def delete(self, current_user):
         """Delete current user account"""
+        user = current_user.user
+        if not user:
+            return {'message': 'User not found!'}, 404
         try:
-            db.session.delete(current_user)
+            db.session.delete(user)
+            # Their holdings disappear from responses spanning every user
+            data_versions.bump(data_versions.user_key(current_user.id))
             db.session.commit()
+            revoked_user_ids[current_user.id] = True
             return {"message": "User account deleted successfully"}, 200
+        except ledger.LedgerError as e:
+            db.session.rollback()
+            return {"error": str(e)}, 409
         except SQLAlchemyError as e:
             db.session.rollback()
             return {"error": str(e)}, 500
@@ -161,158 +289,399 @@ class LogoutResource(Resource):
 # Stock-related routes
 class StockResource(Resource):
     @token_required
+    @conditional(data_versions.STOCKS)
     def get(self, current_user):
-        stocks = Stock.query.all()
-        result = [{'id': stock.id, 'symbol': stock.symbol, 'company_name': stock.company_name,
-                   'current_price': stock.current_price} for stock in stocks]
-        return result, 200
+        return records(STOCKS_PROJECTION), 200
+
+class TickerSearchResource(Resource):
+    @token_required
+    def get(self, current_user):
+        """Typeahead: the best ticker matches for ?q= by symbol or company name (?limit=, default 10)"""
+        query = request.args.get('q', '')
+        limit = request.args.get('limit', 10, type=int)
+        return {'results': ticker_search.search(query, limit)}, 200
 
 class HistoricalDataResource(Resource):
     @token_required
     def get(self, current_user, symbol):
+        start = request.args.get('from', type=int)
+        end = request.args.get('to', type=int)
+        start_day = price_bars.from_epoch(start) if start is not None else None
+        end_day = price_bars.from_epoch(end) if end is not None else None
         try:
-            response = requests.get(
-                f'https://apidojo-yahoo-finance-v1.p.rapidapi.com/stock/v3/get-historical-data',
-                headers={'x-rapidapi-key': RAPID_API_KEY, 'x-rapidapi-host': RAPID_API_HOST},
-                params={'symbol': symbol, 'region': 'US'}
+            bars, fetched_at = historical_cache.get_bars(
+                symbol,
+                lambda: price_bars.load_bars(symbol, fetch_historical_prices, start_day, end_day),
+                start_day, end_day
             )
-            data = response.json().get('prices', [])
-            filtered_data = [item for item in data if item.get('close') is not None]
-            return filtered_data, 200
+        except market_data.MarketDataError as e:
+            # Degraded mode: serve whatever bars are already stored rather than fail
+            bars = price_bars.query_bars(symbol, start_day, end_day)
+            if not bars:
+                return {'error': str(e)}, 503
+            return bars, 200, stale_headers(datetime.utcfromtimestamp(bars[-1]['date']))
         except Exception as e:
             return {'error': str(e)}, 500
 
+        if (datetime.utcnow() - fetched_at).total_seconds() >= historical_cache.STALE_SECONDS:
+            return bars, 200, stale_headers(fetched_at)
+        return bars, 200
+
+class IndicatorResource(Resource):
+    @token_required
+    def get(self, current_user, symbol):
+        """Latest indicator values for a symbol, or the last `points` values of each series"""
+        names = request.args.get('set')
+        names = tuple(names.split(',')) if names else indicators.INDICATORS
+        unknown = set(names) - set(indicators.INDICATORS)
+        if unknown:
+            return {'error': f"Unknown indicators: {', '.join(sorted(unknown))}"}, 400
+        points = request.args.get('points', type=int)
+
+        try:
+            # Gap-fill stored bars up to the last session; indicators are computed from those
+            price_bars.refresh_symbol(symbol, fetch_historical_prices)
+        except market_data.MarketDataError as e:
+            app.logger.warning("Computing indicators for %s from stored bars only: %s", symbol, e)
+
+        if points:
+            result = indicators.history(symbol, names, points)
+        else:
+            result = indicators.latest(symbol, names)
+        if result is None:
+            return {'error': f"No price history for {symbol}"}, 404
+        return result, 200
+
+def log_rejected_orders(rejected):
+    """Record limit orders cancelled at fill time because their owner no longer held the shares."""
+    for entry in rejected:
+        app.logger.warning("Cancelled limit order %s: %s", entry['order_id'], entry['error'])
+
+def valid_tick(tick):
+    """Whether tick is a {symbol, price} object with a non-empty symbol and a positive, finite price."""
+    if not isinstance(tick, dict):
+        return False
+    symbol = tick.get('symbol')
+    return isinstance(symbol, str) and bool(symbol) and pricing.valid_price(tick.get('price'))
+
+def stale_headers(as_of):
+    """Headers marking a response served from stale data while the provider is unavailable."""
+    return {'Warning': '110 - "Response is Stale"', 'X-Data-As-Of': as_of.isoformat() + 'Z'}
+
 class UpdateStockPriceResource(Resource):
     @token_required
     def post(self, current_user):
-        data = request.json
-        symbol, latest_price = data.get("symbol"), data.get("latest_price")
-        if not symbol or latest_price is None:
-            return {"error": "Symbol and latest price are required"}, 400
-        stock = Stock.query.filter_by(symbol=symbol).first()
-        if not stock:
-            return {"error": "Stock not found"}, 404
-        stock.current_price = latest_price
-        for portfolio in Portfolio.query.filter_by(stock_id=stock.id).all():
-            portfolio.current_value = portfolio.quantity * latest_price
-            portfolio.net_profit_loss = (latest_price - portfolio.avg_buy_price) * portfolio.quantity
-        db.session.commit()
-        return {"message": f"{symbol} price updated successfully"}, 200
+        data = request.get_json(silent=True)
+        # A list of {symbol, latest_price} pairs is applied in one transaction
+        updates = data if isinstance(data, list) else [data]
+        prices = {}
+        for item in updates:
+            if not isinstance(item, dict):
+                return {"error": "Symbol and latest price are required"}, 400
+            symbol, latest_price = item.get("symbol"), item.get("latest_price")
+            if not valid_tick({'symbol': symbol, 'price': latest_price}):
+                return {"error": "Each update needs a symbol and a positive numeric latest price"}, 400
+            prices[symbol] = latest_price
+
+        with order_book.transaction() as matched:
+            not_found, rejected = pricing.apply_prices(prices)
+            if not isinstance(data, list) and not_found:
+                db.session.rollback()
+                return {"error": "Stock not found"}, 404
+            try:
+                db.session.commit()
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                return {"error": str(e)}, 500
+            matched.commit()
+        log_rejected_orders(rejected)
+        streaming.publish_prices({symbol: price for symbol, price in prices.items() if symbol not in not_found})
+
+        if isinstance(data, list):
+            return {"updated": len(prices) - len(not_found), "not_found": not_found, "rejected_orders": rejected}, 200
+        return {"message": f"{symbol} price updated successfully", "rejected_orders": rejected}, 200
+
+class PriceBatchResource(Resource):
+    @token_required
+    def post(self, current_user):
+        """Apply a batch of {symbol, price} ticks, keeping the last price per symbol"""
+        data = request.get_json(silent=True)
+        ticks = data.get('ticks') if isinstance(data, dict) else None
+        if not isinstance(ticks, list):
+            return {"error": "A list of ticks is required"}, 400
+        if not all(valid_tick(tick) for tick in ticks):
+            return {"error": "Each tick needs a symbol and a positive numeric price"}, 400
+
+        prices = pricing.coalesce_ticks(ticks)
+        with order_book.transaction() as matched:
+            not_found, rejected = pricing.apply_prices(prices)
+            try:
+                db.session.commit()
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                return {"error": str(e)}, 500
+            matched.commit()
+        log_rejected_orders(rejected)
+        streaming.publish_prices({symbol: price for symbol, price in prices.items() if symbol not in not_found})
+        return {"ticks": len(ticks), "updated": len(prices) - len(not_found), "not_found": not_found,
+                "rejected_orders": rejected}, 200
+
+class StreamResource(Resource):
+    @token_required
+    def get(self, current_user):
+        """Server-Sent Events stream of price changes for ?symbols=A,B (default: the user's
+        holdings) and of the user's portfolio totals. Replaces polling /api/stocks."""
+        symbols = request.args.get('symbols')
+        if symbols:
+            symbols = [symbol for symbol in symbols.split(',') if symbol]
+        else:
+            symbols = [symbol for symbol, in db.session.query(Stock.symbol).join(
+                Portfolio, Portfolio.stock_id == Stock.id
+            ).filter(Portfolio.user_id == current_user.id)]
+        if len(symbols) > streaming.MAX_SYMBOLS:
+            return {"error": f"At most {streaming.MAX_SYMBOLS} symbols per stream"}, 400
+
+        subscriber = streaming.subscribe(current_user.id, symbols)
+        response = Response(streaming.events(subscriber), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',
+        })
+        # Runs when the server closes the response, whether or not the body was sent
+        response.call_on_close(lambda: streaming.unsubscribe(subscriber))
+        return response
 
 # Portfolio-related routes
 class PortfolioResource(Resource):
     @token_required
+    @conditional(data_versions.STOCKS, data_versions.USER)
     def get(self, current_user):
-        portfolios = Portfolio.query.filter_by(user_id=current_user.id).all()
-        result = [{'stock_symbol': entry.stock.symbol, 'quantity': entry.quantity,
-                   'avg_buy_price': entry.avg_buy_price, 'current_price': entry.stock.current_price,
-                   'current_value': entry.current_value, 'net_profit_loss': entry.net_profit_loss} for entry in portfolios]
-        return result, 200
+        return records(PORTFOLIO_PROJECTION, {'user_id': current_user.id}), 200
 
-# Trade-related routes
-class TradeResource(Resource):
+class PortfolioSummaryResource(Resource):
     @token_required
-    def post(self, current_user):
-        data = request.get_json()
-        stock = Stock.query.get(data['stock_id'])
-        
-        if not stock:
-            return {"error": "Stock not found."}, 404
+    def get(self, current_user):
+        """Current user's portfolio totals, maintained incrementally on every write"""
+        summary = db.session.get(PortfolioSummary, current_user.id)
+        if summary is None:
+            portfolio_summary.ensure_summary(current_user.id)
+            db.session.commit()
+            summary = db.session.get(PortfolioSummary, current_user.id)
+        return portfolio_summary.to_dict(summary), 200
 
-        trade_type = data['trade_type']
-        quantity = data['quantity']
-        price_at_trade = stock.current_price
-        net_profit = 0.0
+class PortfolioRiskResource(Resource):
+    @token_required
+    def get(self, current_user):
+        """Risk of the current user's portfolio as a whole and of each holding"""
+        rows = db.session.query(
+            Stock.symbol, Portfolio.current_value, Portfolio.volatility, Portfolio.sharpe_ratio,
+            Portfolio.sortino_ratio, Portfolio.max_drawdown, Portfolio.beta
+        ).join(Stock, Portfolio.stock_id == Stock.id).filter(Portfolio.user_id == current_user.id).all()
+        holdings = [{'stock_symbol': symbol, 'volatility': volatility, 'sharpe_ratio': sharpe_ratio,
+                     'sortino_ratio': sortino_ratio, 'max_drawdown': max_drawdown, 'beta': beta}
+                    for symbol, _, volatility, sharpe_ratio, sortino_ratio, max_drawdown, beta in rows]
+        portfolio = analytics.portfolio_risk({row.symbol: row.current_value or 0.0 for row in rows}) if rows else None
+        return {'portfolio': portfolio, 'holdings': holdings}, 200
+
+class PortfolioCorrelationResource(Resource):
+    @token_required
+    def get(self, current_user):
+        """Pairwise return correlations of the current user's holdings and the portfolio's variance"""
+        rows = db.session.query(Stock.symbol, Portfolio.current_value).join(
+            Stock, Portfolio.stock_id == Stock.id
+        ).filter(Portfolio.user_id == current_user.id).all()
+        if not rows:
+            return {'symbols': [], 'correlation': [], 'portfolio_variance': None, 'portfolio_volatility': None}, 200
+        return analytics.portfolio_correlation({symbol: value or 0.0 for symbol, value in rows}), 200
+
+class PortfolioPositionsResource(Resource):
+    @token_required
+    def get(self, current_user):
+        """The current user's holdings at the end of a past day (?as_of=YYYY-MM-DD, default today)"""
+        try:
+            as_of = date.fromisoformat(request.args.get('as_of') or date.today().isoformat())
+        except ValueError:
+            return {"error": "as_of must be a date (YYYY-MM-DD)"}, 400
+        positions = ledger.positions_at(current_user.id, ledger.end_of_day(as_of))
+        symbols = dict(db.session.execute(
+            select(Stock.id, Stock.symbol).where(Stock.id.in_(list(positions)))
+        ).all()) if positions else {}
+        return {'as_of': as_of.isoformat(), 'positions': [
+            {'stock_id': stock_id, 'stock_symbol': symbols.get(stock_id, 'N/A'),
+             'quantity': quantity, 'avg_buy_price': avg_buy_price}
+            for stock_id, (quantity, avg_buy_price) in sorted(positions.items())
+        ]}, 200
+
+class PortfolioHistoryResource(Resource):
+    @token_required
+    def get(self, current_user):
+        """Daily market value, cost basis and P&L of the current user's portfolio from the nightly rollup
 
-        # Get or create the portfolio entry
-        portfolio_entry = Portfolio.query.filter_by(user_id=current_user.id, stock_id=stock.id).first()
-        
-        if trade_type == 'buy':
-            # Calculate trade value
-            trade_value = quantity * price_at_trade
-            if portfolio_entry:
-                # Update existing entry
-                total_cost = (portfolio_entry.avg_buy_price * portfolio_entry.quantity) + trade_value
-                new_quantity = portfolio_entry.quantity + quantity
-                portfolio_entry.avg_buy_price = total_cost / new_quantity
-                portfolio_entry.quantity = new_quantity
-                portfolio_entry.current_value = new_quantity * price_at_trade
-            else:
-                # Create new portfolio entry
-                portfolio_entry = Portfolio(
-                    user_id=current_user.id,
-                    stock_id=stock.id,
-                    quantity=quantity,
-                    avg_buy_price=price_at_trade,
-                    initial_capital=trade_value,
-                    current_value=trade_value,
-                    net_profit_loss=0.0
-                )
-                db.session.add(portfolio_entry)
-
-        elif trade_type == 'sell':
-            if not portfolio_entry or portfolio_entry.quantity < quantity:
-                return {"error": "Insufficient stock quantity."}, 400
-            
-            # Calculate net profit
-            sale_value = quantity * price_at_trade
-            buy_cost = quantity * portfolio_entry.avg_buy_price
-            net_profit = sale_value - buy_cost
-            
-            # Update portfolio entry
-            portfolio_entry.quantity -= quantity
-            portfolio_entry.net_profit_loss += net_profit
-            if portfolio_entry.quantity == 0:
-                db.session.delete(portfolio_entry)
-            else:
-                portfolio_entry.current_value = portfolio_entry.quantity * price_at_trade
-
-        # Log the trade
-        trade = Trade(
-            user_id=current_user.id,
-            stock_id=stock.id,
-            trade_type=trade_type,
-            quantity=quantity,
-            price_at_trade=price_at_trade,
-            net_profit=net_profit if trade_type == 'sell' else 0.0,
-            timestamp=datetime.utcnow()
-        )
+        ?from=&to= are dates (YYYY-MM-DD; default the year to today) and
+        ?interval= is day, week or month.
+        """
+        try:
+            end = date.fromisoformat(request.args.get('to') or date.today().isoformat())
+            start = date.fromisoformat(request.args.get('from') or (end - timedelta(days=365)).isoformat())
+        except ValueError:
+            return {"error": "from and to must be dates (YYYY-MM-DD)"}, 400
+        interval = request.args.get('interval', 'day')
+        if interval not in portfolio_history.INTERVALS:
+            return {"error": f"interval must be one of {', '.join(portfolio_history.INTERVALS)}"}, 400
+        if start > end or (end - start).days > portfolio_history.MAX_DAYS:
+            return {"error": f"from must be before to and at most {portfolio_history.MAX_DAYS} days earlier"}, 400
+        return portfolio_history.history(current_user.id, start, end, interval), 200
 
-        db.session.add(trade)
-        
+# Trade-related routes
+class TradeResource(Resource):
+    @token_required
+    def post(self, current_user):
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return {"error": "A trade object is required"}, 400
         try:
+            trade_service.execute_trade(
+                current_user.id, data.get('stock_id'), data.get('trade_type'), data.get('quantity')
+            )
             db.session.commit()
+            streaming.publish_portfolios([current_user.id])
             return {"message": "Trade executed successfully"}, 201
+        except trade_service.TradeError as e:
+            db.session.rollback()
+            return {"error": e.message}, e.status
         except SQLAlchemyError as e:
             db.session.rollback()
             return {"error": str(e)}, 500
 
+    @token_required
+    @conditional(data_versions.USER)
+    def get(self, current_user):
+        """Trade history, newest first.
+
+        ?limit=N&after=<cursor> pages by (timestamp, id); the cursor for the next
+        page is returned in the X-Next-Cursor header. ?format=ndjson streams the
+        full history one JSON object per line.
+        """
+        query = TRADES_PROJECTION
+        params = {'user_id': current_user.id}
+
+        if request.args.get('format') == 'ndjson':
+            def generate():
+                result = db.session.execute(query, params, execution_options={'yield_per': 1000})
+                keys = tuple(result.keys())
+                for row in result:
+                    yield serialization.dumps(dict(zip(keys, row))) + b'\n'
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+        after = request.args.get('after')
+        if after:
+            try:
+                timestamp, trade_id = after.rsplit('_', 1)
+                timestamp, trade_id = datetime.fromisoformat(timestamp), int(trade_id)
+            except ValueError:
+                return {"error": "Invalid cursor"}, 400
+            query = query.where(or_(
+                Trade.timestamp < timestamp,
+                and_(Trade.timestamp == timestamp, Trade.id < trade_id)
+            ))
+
+        limit = request.args.get('limit', type=int)
+        rows = records(query.limit(limit) if limit else query, params)
+        if limit and len(rows) == limit:
+            return rows, 200, {'X-Next-Cursor': f"{rows[-1]['timestamp'].isoformat()}_{rows[-1]['id']}"}
+        return rows, 200
+
+class TradeBatchResource(Resource):
+    @token_required
+    def post(self, current_user):
+        """Execute many orders in one transaction and report a result per order"""
+        data = request.get_json(silent=True)
+        orders = data.get('orders') if isinstance(data, dict) else None
+        if not isinstance(orders, list) or not orders or not all(isinstance(order, dict) for order in orders):
+            return {"error": "A list of orders is required"}, 400
+        try:
+            results = trade_service.execute_batch(current_user.id, orders)
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            return {"error": str(e)}, 500
+        streaming.publish_portfolios([current_user.id])
+        return {"results": results}, 200
 
+class OrderResource(Resource):
     @token_required
     def get(self, current_user):
-        trades = Trade.query.filter_by(user_id=current_user.id).all()
-        result = [
-            {
-                'stock_symbol': trade.stock.symbol if trade.stock else 'N/A',
-                'trade_type': trade.trade_type,
-                'quantity': trade.quantity,
-                'price_at_trade': trade.price_at_trade,
-                'net_profit': trade.net_profit,
-                'timestamp': trade.timestamp.isoformat()
-            }
-            for trade in trades
-        ]
-        return jsonify(result)
+        """List the current user's open limit orders"""
+        return [order.to_dict() for order in order_book.open_orders(current_user.id)], 200
+
+    @token_required
+    def post(self, current_user):
+        """Place a limit order; any immediately matched quantity is filled"""
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return {"error": "An order object is required"}, 400
+        side, quantity, limit_price = data.get('side'), data.get('quantity'), data.get('limit_price')
+        if side not in ('buy', 'sell'):
+            return {"error": "Invalid order side."}, 400
+        if not trade_service.valid_quantity(quantity) or not pricing.valid_price(limit_price):
+            return {"error": "Quantity and limit price must be positive."}, 400
+        if not trade_service.valid_id(data.get('stock_id')):
+            return {"error": "Invalid stock id."}, 400
+
+        stock = db.session.get(Stock, data['stock_id'])
+        if not stock:
+            return {"error": "Stock not found."}, 404
+
+        with order_book.transaction() as matched:
+            if side == 'sell':
+                # Shares already offered by the user's open sell orders are spoken for
+                held = db.session.query(Portfolio.quantity).filter_by(user_id=current_user.id, stock_id=stock.id).scalar()
+                if (held or 0) - order_book.reserved(current_user.id, stock.id) < quantity:
+                    return {"error": "Insufficient stock quantity."}, 400
+            try:
+                order, settled, rejected = order_book.submit(
+                    current_user.id, stock.id, side, quantity, limit_price, stock.current_price
+                )
+                db.session.commit()
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                return {"error": str(e)}, 500
+            matched.commit()
+        log_rejected_orders(rejected)
+        filled_orders = {fill['order_id'] for fill in settled}
+        streaming.publish_portfolios({
+            filled.user_id for filled in matched.saved if filled.id in filled_orders
+        })
+        return {"order": order.to_dict(), "fills": settled, "rejected": rejected}, 201
+
+    @token_required
+    def delete(self, current_user, order_id):
+        order = order_book.cancel(order_id, current_user.id)
+        if not order:
+            return {"error": "Order not found."}, 404
+        return {"message": "Order cancelled", "order": order.to_dict()}, 200
 
 # Register resources
 api.add_resource(UserResource, '/user')
 api.add_resource(LoginResource, '/login')
 api.add_resource(LogoutResource, '/logout')
 api.add_resource(StockResource, '/api/stocks')
+api.add_resource(TickerSearchResource, '/api/tickers/search')
 api.add_resource(HistoricalDataResource, '/api/historical/<string:symbol>')
+api.add_resource(IndicatorResource, '/api/indicators/<string:symbol>')
 api.add_resource(UpdateStockPriceResource, '/api/update_stock_price')
+api.add_resource(PriceBatchResource, '/api/prices/batch')
+api.add_resource(StreamResource, '/api/stream')
 api.add_resource(PortfolioResource, '/api/portfolio')
+api.add_resource(PortfolioSummaryResource, '/api/portfolio/summary')
+api.add_resource(PortfolioRiskResource, '/api/portfolio/risk')
+api.add_resource(PortfolioCorrelationResource, '/api/portfolio/correlation')
+api.add_resource(PortfolioPositionsResource, '/api/portfolio/positions')
+api.add_resource(PortfolioHistoryResource, '/api/portfolio/history')
 api.add_resource(TradeResource, '/api/trades')
+api.add_resource(TradeBatchResource, '/api/trades/batch')
+api.add_resource(OrderResource, '/api/orders', '/api/orders/<int:order_id>')
 
 if __name__ == '__main__':
+    with app.app_context():
+        ticker_search.index.build()
     app.run(port=int(os.getenv("PORT", 10000)), debug=True)
@@ -0,0 +1,109 @@
+"""Trade writers and API readers hitting one SQLite database from separate processes.
+
+Each writer process posts buy trades; each reader process cycles through
+/api/portfolio, /api/trades and /api/stocks. After DURATION seconds the
+script reports requests/s, latency percentiles and error counts per kind.
+With WAL and the read pool, readers should not wait on writers and no
+request should fail with "database is locked".
+
+    cd server && python benchmarks/concurrent_reads_writes.py [writers] [readers] [seconds]
+"""
+# Standard library imports
+import multiprocessing
+import random
+import sys
+import time
+from datetime import datetime
+
+# Remote library imports
+from sqlalchemy import insert
+
+# Local imports
+import harness  # scratch database; must come first
+from app import app, create_token
+from config import db
+from models import Stock, Trade, User
+
+USERS = 40
+STOCKS = 20
+SEED_TRADES = 40000
+READ_URLS = ('/api/portfolio', '/api/trades?limit=50', '/api/stocks')
+
+
+def seed():
+    """USERS users, STOCKS stocks and SEED_TRADES trades spread over them. Returns a token per user id."""
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.execute(insert(User), harness.user_rows(USERS))
+        db.session.execute(insert(Stock), [
+            {'symbol': f'S{i}', 'company_name': f'Stock {i}', 'current_price': 100.0} for i in range(STOCKS)
+        ])
+        db.session.execute(insert(Trade), [
+            {'user_id': i % USERS + 1, 'stock_id': i % STOCKS + 1, 'trade_type': 'buy', 'quantity': 1,
+             'price_at_trade': 100.0, 'net_profit': 0.0, 'timestamp': datetime.utcnow()}
+            for i in range(SEED_TRADES)
+        ])
+        db.session.commit()
+        return {user.id: create_token(user) for user in User.query.all()}
+
+
+def worker(kind, token, ready, start, duration, results):
+    # Connections opened by the parent must not be shared with this process
+    with app.app_context():
+        db.engine.dispose()
+    client = app.test_client()
+    headers = {'x-access-token': token}
+    latencies, errors = [], 0
+    ready.release()
+    start.wait()
+    stop = time.monotonic() + duration
+    while time.monotonic() < stop:
+        if kind == 'write':
+            body = {'stock_id': random.randint(1, STOCKS), 'trade_type': 'buy', 'quantity': 1}
+            requests = [(client.post, '/api/trades', {'json': body}, 201)]
+        else:
+            requests = [(client.get, url, {}, 200) for url in READ_URLS]
+        for method, url, kwargs, expected in requests:
+            started = time.perf_counter()
+            response = method(url, headers=headers, **kwargs)
+            latencies.append(time.perf_counter() - started)
+            errors += response.status_code != expected
+    results.put((kind, latencies, errors))
+
+
+def main(writers, readers, duration):
+    tokens = seed()
+    context = multiprocessing.get_context('spawn')
+    ready, start, results = context.Semaphore(0), context.Event(), context.Queue()
+    kinds = ['write'] * writers + ['read'] * readers
+    processes = [
+        context.Process(target=worker, args=(kind, tokens[i % USERS + 1], ready, start, duration, results))
+        for i, kind in enumerate(kinds)
+    ]
+    for process in processes:
+        process.start()
+    # Spawned workers take a while to import the app; start them all at once
+    for _ in processes:
+        ready.acquire()
+    start.set()
+
+    totals = {'write': ([], 0), 'read': ([], 0)}
+    for _ in processes:
+        kind, latencies, errors = results.get()
+        totals[kind] = (totals[kind][0] + latencies, totals[kind][1] + errors)
+    for process in processes:
+        process.join()
+
+    print(f"{writers} writers, {readers} readers, {duration}s, {SEED_TRADES:,} seeded trades")
+    for kind, (latencies, errors) in totals.items():
+        if not latencies:
+            continue
+        millis = [latency * 1000 for latency in latencies]
+        print(f"{kind + 's':>6}: {len(latencies) / duration:>6.0f}/s  p50 {harness.percentile(millis, 50):>6.1f}ms  "
+              f"p99 {harness.percentile(millis, 99):>6.1f}ms  max {max(millis):>6.0f}ms  errors {errors}")
+
+
+if __name__ == '__main__':
+    counts = [int(arg) for arg in sys.argv[1:4]]
+    main(*counts + [4, 8, 5][len(counts):])
@@ -0,0 +1,46 @@
+"""Shared setup for the benchmark scripts.
+
+Importing this module points the app at a scratch SQLite database (never the
+one in DATABASE_URL or .env) and makes the server modules importable, so it
+must be imported before anything that imports config.
+"""
+# Standard library imports
+import os
+import sys
+import tempfile
+import time
+
+# Worker processes inherit the parent's scratch database through the environment
+if 'BENCHMARK_DATABASE' not in os.environ:
+    os.environ['BENCHMARK_DATABASE'] = os.path.join(tempfile.mkdtemp(), 'benchmark.db')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.environ['BENCHMARK_DATABASE']}"
+os.environ.pop('DATABASE_REPLICA_URL', None)
+os.environ.setdefault('SECRET_KEY', 'benchmark-secret')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def user_rows(count):
+    """Rows for bulk-inserting count users, whose ids will be 1..count in a fresh schema."""
+    return [
+        {'first_name': 'Bench', 'last_name': str(i), 'username': f'bench{i}', 'email': f'bench{i}@example.com',
+         'password_hash': 'x'}
+        for i in range(count)
+    ]
+
+
+def percentile(samples, p):
+    """The p-th percentile (0-100) of samples, nearest-rank."""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] if ordered else 0.0
+
+
+def best_of(fn, runs=5, before=None):
+    """Fastest wall time of fn() in seconds over several runs; before() runs untimed ahead of each."""
+    best = float('inf')
+    for _ in range(runs):
+        if before:
+            before()
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
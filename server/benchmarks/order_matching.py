@@ -0,0 +1,98 @@
+"""Limit order throughput and latency percentiles.
+
+Two runs over the same random order flow (buys and sells with limits
+scattered around the market price, so roughly half of them cross):
+
+- book: OrderBook.add alone, with a settle callback that accepts every cross
+- api: POST /api/orders, which also checks holdings and writes the fills as trades
+
+    cd server && python benchmarks/order_matching.py [book orders] [api orders]
+"""
+# Standard library imports
+import random
+import sys
+import time
+
+# Remote library imports
+from sqlalchemy import insert
+
+# Local imports
+import harness  # scratch database; must come first
+from app import app, create_token
+from config import db
+from models import Portfolio, Stock, User
+import order_book
+
+MARKET_PRICE = 100.0
+TRADERS = 20
+
+
+def order_flow(count, seed=1):
+    """(side, quantity, limit_price) tuples around MARKET_PRICE."""
+    rng = random.Random(seed)
+    return [
+        (rng.choice(('buy', 'sell')), rng.randint(1, 10), round(MARKET_PRICE + rng.uniform(-1.0, 1.0), 2))
+        for _ in range(count)
+    ]
+
+
+def report(name, latencies, elapsed):
+    micros = [latency * 1e6 for latency in latencies]
+    print(f"{name:>4}: {len(latencies) / elapsed:>9,.0f} orders/s  p50 {harness.percentile(micros, 50):>7,.1f}us  "
+          f"p99 {harness.percentile(micros, 99):>7,.1f}us  p99.9 {harness.percentile(micros, 99.9):>7,.1f}us")
+
+
+def bench_book(count):
+    book = order_book.OrderBook()
+    orders = [order_book.Order(i, i % TRADERS, 1, side, price, quantity)
+              for i, (side, quantity, price) in enumerate(order_flow(count), 1)]
+    latencies = []
+    with order_book.transaction() as journal:
+        started = time.perf_counter()
+        for order in orders:
+            t = time.perf_counter()
+            book.add(order, lambda legs: None)
+            latencies.append(time.perf_counter() - t)
+        elapsed = time.perf_counter() - started
+        journal.commit()
+    report('book', latencies, elapsed)
+
+
+def bench_api(count):
+    db.drop_all()
+    db.create_all()
+    db.session.add(Stock(symbol='AAPL', company_name='Apple Inc', current_price=MARKET_PRICE))
+    db.session.execute(insert(User), harness.user_rows(TRADERS))
+    # Enough shares that no sell order is refused
+    db.session.execute(insert(Portfolio), [
+        {'user_id': user_id, 'stock_id': 1, 'quantity': 10 * count, 'avg_buy_price': MARKET_PRICE}
+        for user_id in range(1, TRADERS + 1)
+    ])
+    db.session.commit()
+    headers = [{'x-access-token': create_token(user)} for user in User.query.order_by(User.id)]
+    order_book.books.clear()
+    order_book.orders.clear()
+
+    client = app.test_client()
+    latencies = []
+    started = time.perf_counter()
+    for i, (side, quantity, price) in enumerate(order_flow(count)):
+        body = {'stock_id': 1, 'side': side, 'quantity': quantity, 'limit_price': price}
+        t = time.perf_counter()
+        response = client.post('/api/orders', json=body, headers=headers[i % TRADERS])
+        latencies.append(time.perf_counter() - t)
+        if response.status_code != 201:
+            raise SystemExit(f"Order {i} failed: {response.status_code} {response.get_json()}")
+    elapsed = time.perf_counter() - started
+    report('api', latencies, elapsed)
+
+
+def main(book_orders, api_orders):
+    bench_book(book_orders)
+    with app.app_context():
+        bench_api(api_orders)
+
+
+if __name__ == '__main__':
+    counts = [int(arg) for arg in sys.argv[1:3]]
+    main(*counts + [100000, 2000][len(counts):])
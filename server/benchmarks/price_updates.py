@@ -0,0 +1,64 @@
+"""Rows per second revalued by a price update: the old per-row ORM loop against pricing.apply_prices.
+
+    cd server && python benchmarks/price_updates.py [holdings]
+"""
+# Standard library imports
+import sys
+import time
+
+# Remote library imports
+from sqlalchemy import insert
+
+# Local imports
+import harness  # scratch database; must come first
+from app import app
+from config import db
+from models import Portfolio, Stock, User
+import order_book
+import pricing
+
+
+def seed(holdings):
+    """One stock held by `holdings` users."""
+    db.drop_all()
+    db.create_all()
+    db.session.add(Stock(symbol='AAPL', company_name='Apple Inc', current_price=100.0))
+    db.session.execute(insert(User), harness.user_rows(holdings))
+    db.session.execute(insert(Portfolio), [
+        {'user_id': i + 1, 'stock_id': 1, 'quantity': 10, 'avg_buy_price': 90.0, 'current_value': 1000.0,
+         'net_profit_loss': 100.0}
+        for i in range(holdings)
+    ])
+    db.session.commit()
+
+
+def orm_loop(price):
+    """How UpdateStockPriceResource revalued holdings before pricing: load and update each row."""
+    stock = Stock.query.filter_by(symbol='AAPL').one()
+    stock.current_price = price
+    for holding in Portfolio.query.filter_by(stock_id=stock.id).all():
+        holding.current_value = holding.quantity * price
+        holding.net_profit_loss = (price - holding.avg_buy_price) * holding.quantity
+    db.session.commit()
+
+
+def set_based(price):
+    with order_book.transaction() as matched:
+        pricing.apply_prices({'AAPL': price})
+        db.session.commit()
+        matched.commit()
+
+
+def main(holdings):
+    with app.app_context():
+        seed(holdings)
+        for name, update, price in (('ORM loop', orm_loop, 101.0), ('set-based', set_based, 102.0)):
+            db.session.expunge_all()
+            started = time.perf_counter()
+            update(price)
+            elapsed = time.perf_counter() - started
+            print(f"{name:>10}: {holdings / elapsed:>11,.0f} rows/s ({elapsed:.3f}s)")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
@@ -0,0 +1,91 @@
+"""Time to load and encode 10k trade rows, before and after the Core projection + orjson change.
+
+- ORM: Trade objects through SerializerMixin.to_dict, indented json.dumps (before)
+- ORM with hand-built dicts, indented json.dumps
+- TRADES_PROJECTION rows through serialization.dumps, with orjson and with
+  the standard-library fallback
+
+Each line is the best of several runs, total and encoding only.
+
+    cd server && python benchmarks/serialization.py [rows]
+"""
+# Standard library imports
+import json
+import sys
+from datetime import datetime, timedelta
+
+# Remote library imports
+from sqlalchemy import insert
+
+# Local imports
+import harness  # scratch database; must come first
+from app import TRADES_PROJECTION, app
+from config import db
+from db_helpers import records
+from models import Stock, Trade, User
+import serialization
+
+FIELDS = ('id', 'trade_type', 'quantity', 'price_at_trade', 'net_profit', 'timestamp')
+
+
+def seed(rows):
+    db.drop_all()
+    db.create_all()
+    db.session.add(Stock(symbol='AAPL', company_name='Apple Inc', current_price=100.0))
+    db.session.execute(insert(User), harness.user_rows(1))
+    start = datetime(2024, 1, 1)
+    db.session.execute(insert(Trade), [
+        {'user_id': 1, 'stock_id': 1, 'trade_type': 'buy' if i % 3 else 'sell', 'quantity': i % 50 + 1,
+         'price_at_trade': 100 + i % 700 / 7, 'net_profit': i % 11 - 5.5, 'timestamp': start + timedelta(minutes=i)}
+        for i in range(rows)
+    ])
+    db.session.commit()
+
+
+def orm_to_dict(trades):
+    return json.dumps([trade.to_dict(only=FIELDS) for trade in trades], indent=2, default=str).encode()
+
+
+def orm_hand_built(trades):
+    return json.dumps([
+        {'id': t.id, 'trade_type': t.trade_type, 'quantity': t.quantity, 'price_at_trade': t.price_at_trade,
+         'net_profit': t.net_profit, 'timestamp': t.timestamp.isoformat()}
+        for t in trades
+    ], indent=2).encode()
+
+
+def load_trades():
+    return Trade.query.filter_by(user_id=1).order_by(Trade.timestamp.desc()).all()
+
+
+def load_records():
+    return records(TRADES_PROJECTION, {'user_id': 1})
+
+
+def measure(name, load, encode):
+    """Print the best total (load + encode) and encode-only times for one path."""
+    total = harness.best_of(lambda: encode(load()), before=db.session.expunge_all)
+    loaded = load()
+    encoding = harness.best_of(lambda: encode(loaded))
+    size = len(encode(loaded))
+    print(f"{name:<34} {total * 1000:>8.1f}ms  (encoding {encoding * 1000:>7.1f}ms)  {size / 1e6:.2f}MB")
+
+
+def main(rows):
+    with app.app_context():
+        seed(rows)
+        print(f"{rows:,} trade rows")
+        measure('ORM + to_dict + indented json', load_trades, orm_to_dict)
+        measure('ORM + hand-built dicts + indented', load_trades, orm_hand_built)
+        if serialization.orjson is not None:
+            measure('Core projection + orjson', load_records, serialization.dumps)
+        # The same encoder without orjson installed
+        orjson, serialization.orjson = serialization.orjson, None
+        try:
+            measure('Core projection + stdlib fallback', load_records, serialization.dumps)
+        finally:
+            serialization.orjson = orjson
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -1,6 +1,8 @@
 # Standard library imports
+import os
 
 # Remote library imports
+from dotenv import load_dotenv
 from flask import Flask
 from flask_cors import CORS
 from flask_migrate import Migrate
@@ -9,23 +11,31 @@ from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy import MetaData
 
 # Local imports
+from database import RoutingSession, configure, install_pragmas, replica_urls
+from serialization import FastJSONProvider
+
+load_dotenv()
 
 # Instantiate app, set attributes
 app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///app.db'
+configure(app, os.getenv("DATABASE_URL", "sqlite:///app.db"), replica_urls())
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.json.compact = False
+app.json = FastJSONProvider(app)
 
 # Define metadata, instantiate db
 metadata = MetaData(naming_convention={
     "fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s",
 })
-db = SQLAlchemy(metadata=metadata)
+db = SQLAlchemy(metadata=metadata, session_options={'class_': RoutingSession})
 migrate = Migrate(app, db)
 db.init_app(app)
+with app.app_context():
+    install_pragmas(db.engines)
 
 # Instantiate REST API
 api = Api(app)
 
 # Instantiate CORS
-CORS(app, resources={r"/*": {"origins": "http://localhost:3000"}})
+# Credentials let the client carry the read-your-writes cookie (database.PIN_COOKIE)
+CORS(app, resources={r"/*": {"origins": "http://localhost:3000"}}, expose_headers=["X-Next-Cursor"],
+     supports_credentials=True)
@@ -0,0 +1,51 @@
+# Remote library imports
+from sqlalchemy import func, select, update
+
+# Local imports
+from config import db
+from db_helpers import insert_ignoring_conflict
+from models import DataVersion
+
+# Counters behind conditional GETs. Writers bump them in the same transaction
+# as the change, so a response's ETag can be derived from the counters alone.
+STOCKS = 'stocks'
+USER = 'user'    # the requesting user's counter
+USERS = 'users'  # every user's counter, for responses that span all holdings
+
+
+def user_key(user_id):
+    return f"user:{user_id}"
+
+
+def bump(*keys):
+    """Increment the given counters, creating missing ones at 1. Does not commit."""
+    keys = set(keys)
+    increment = (
+        update(DataVersion)
+        .values(version=DataVersion.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if db.session.execute(increment.where(DataVersion.key.in_(keys))).rowcount == len(keys):
+        return
+    existing = set(db.session.execute(select(DataVersion.key).where(DataVersion.key.in_(keys))).scalars())
+    for key in keys - existing:
+        created = db.session.execute(insert_ignoring_conflict(DataVersion, {'key': key, 'version': 1}, ['key']))
+        if not created.rowcount:
+            # Created concurrently since the UPDATE above
+            db.session.execute(increment.where(DataVersion.key == key))
+
+
+def etag(keys, user_id=None):
+    """An ETag value for a response built from the data behind keys."""
+    names = [user_key(user_id) if key == USER else key for key in keys if key != USERS]
+    versions = dict(db.session.execute(
+        select(DataVersion.key, DataVersion.version).where(DataVersion.key.in_(names))
+    ).all()) if names else {}
+    parts = [f"{name}.{versions.get(name, 0)}" for name in names]
+    if USERS in keys:
+        # Counters only ever grow, so their sum changes whenever any of them does
+        total = db.session.execute(
+            select(func.coalesce(func.sum(DataVersion.version), 0)).where(DataVersion.key.like('user:%'))
+        ).scalar_one()
+        parts.append(f"users.{total}")
+    return '-'.join(parts)
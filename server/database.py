@@ -0,0 +1,160 @@
+# Standard library imports
+import os
+import math
+import random
+import sqlite3
+import time
+
+# Remote library imports
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+# Bind keys of the pools that serve reads: 'read', 'read_1', 'read_2', ...
+READ_BIND = 'read'
+
+# After a client writes, its reads go to the primary for this long, so it sees
+# its own writes despite replication lag. The deadline travels in a cookie, so
+# it holds whichever worker or host serves the next request.
+PIN_SECONDS = float(os.getenv("DATABASE_REPLICA_PIN_SECONDS", 5))
+PIN_COOKIE = 'primary_until'
+
+# Applied to every SQLite connection. WAL lets readers run alongside the single
+# writer; synchronous=NORMAL is durable at checkpoints and cannot corrupt a WAL
+# database; cache_size is in KiB when negative.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+    'busy_timeout': 5000,
+    'temp_store': 'MEMORY',
+}
+
+
+def configure(app, url, replica_urls=()):
+    """Set the primary database URI and the read binds.
+
+    Each replica URL gets its own read bind. Without replicas, a SQLite file
+    gets a read pool on the same file.
+    """
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+    if replica_urls:
+        for i, replica_url in enumerate(replica_urls):
+            binds[READ_BIND if i == 0 else f"{READ_BIND}_{i}"] = replica_url
+    elif url.startswith('sqlite:///') and ':memory:' not in url:
+        binds[READ_BIND] = url
+
+
+def replica_urls():
+    """Replica URLs from the comma-separated DATABASE_REPLICA_URL."""
+    return [url.strip() for url in os.getenv("DATABASE_REPLICA_URL", "").split(',') if url.strip()]
+
+
+def is_read_bind(key):
+    return key == READ_BIND or (key or '').startswith(READ_BIND + '_')
+
+
+def pin(response, secure=False):
+    """Send the client's reads to the primary for the next PIN_SECONDS.
+
+    Over HTTPS the cookie is SameSite=None, so a client served from another
+    site still sends it on its credentialed requests; browsers only accept
+    that on secure cookies.
+    """
+    response.set_cookie(PIN_COOKIE, f"{time.time() + PIN_SECONDS:.3f}", max_age=math.ceil(PIN_SECONDS),
+                        httponly=True, secure=secure, samesite='None' if secure else 'Lax')
+
+
+def pinned(cookies):
+    """Whether a request's cookies carry an unexpired pin.
+
+    The cookie is not signed: editing it can only send the client's own reads
+    to the primary, and never for more than PIN_SECONDS ahead.
+    """
+    try:
+        until = float(cookies.get(PIN_COOKIE, 0))
+    except ValueError:
+        return False
+    now = time.time()
+    return now < until <= now + PIN_SECONDS
+
+
+def lock_for_write(session):
+    """Hold the primary's write lock from now until session's transaction ends.
+
+    On SQLite, SELECT ... FOR UPDATE is ignored and pysqlite only opens a
+    transaction at the first INSERT/UPDATE/DELETE, so reads made before that
+    can be stale by the time the write lands. Starting the transaction with
+    BEGIN IMMEDIATE takes the lock (waiting up to busy_timeout) before them.
+    Other databases rely on the row locks that FOR UPDATE takes.
+    """
+    session.info['wrote'] = True
+    connection = session.connection()
+    if connection.dialect.name == 'sqlite' and not connection.connection.driver_connection.in_transaction:
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def install_pragmas(engines):
+    """Tune every SQLite engine on connect and make read-bind connections read-only."""
+    for key, engine in engines.items():
+        if engine.dialect.name == 'sqlite':
+            event.listen(engine, 'connect', _pragma_listener(query_only=is_read_bind(key)))
+        elif engine.dialect.name == 'postgresql' and is_read_bind(key):
+            event.listen(engine, 'connect', _postgres_read_only)
+
+
+def _postgres_read_only(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("SET SESSION CHARACTERISTICS AS TRANSACTION READ ONLY")
+    cursor.close()
+
+
+def _pragma_listener(query_only):
+    def set_pragmas(dbapi_connection, connection_record):
+        if not isinstance(dbapi_connection, sqlite3.Connection):
+            return
+        cursor = dbapi_connection.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        if query_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+    return set_pragmas
+
+
+class RoutingSession(Session):
+    """db.session class that sends reads to a read bind while info['read_only'] is set.
+
+    Only plain SELECTs are routed. Flushes, INSERT/UPDATE/DELETE and SELECT ...
+    FOR UPDATE go to the primary, and once a session has written, the rest of
+    its reads follow to the primary too, so a request always sees its own
+    writes. Read binds are query-only where the database supports it, so a
+    write that slips through is rejected rather than lost.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self.info.get('read_only') and not self.info.get('wrote'):
+            if self._flushing or _writes(clause):
+                self.info['wrote'] = True
+            else:
+                engine = self._read_engine()
+                if engine is not None:
+                    return engine
+        return super().get_bind(mapper, clause=clause, bind=bind, **kwargs)
+
+    def _read_engine(self):
+        """The read bind this session uses, picked at random once per session."""
+        key = self.info.get('read_bind')
+        if key is None:
+            keys = [key for key in self._db.engines if is_read_bind(key)]
+            if not keys:
+                return None
+            key = self.info['read_bind'] = random.choice(keys)
+        return self._db.engines[key]
+
+
+def _writes(clause):
+    return clause is not None and (
+        getattr(clause, 'is_dml', False) or getattr(clause, '_for_update_arg', None) is not None
+    )
@@ -0,0 +1,25 @@
+# Remote library imports
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+
+# Local imports
+from config import db
+
+
+def insert_ignoring_conflict(model, values, index_elements):
+    """INSERT a row, doing nothing if one with the same index_elements already exists."""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        stmt = postgresql.insert(model)
+    elif dialect == 'sqlite':
+        stmt = sqlite.insert(model)
+    else:
+        return insert(model).values(**values)
+    return stmt.values(**values).on_conflict_do_nothing(index_elements=index_elements)
+
+
+def records(statement, params=None):
+    """Run a column projection and return its rows as dicts keyed by the column labels."""
+    result = db.session.execute(statement, params)
+    keys = tuple(result.keys())
+    return [dict(zip(keys, row)) for row in result]
@@ -0,0 +1,89 @@
+# Standard library imports
+import threading
+from datetime import datetime
+
+# Remote library imports
+from cachetools import TTLCache
+
+# Local imports
+from config import app
+
+# Entries younger than FRESH_SECONDS are served as-is. Older entries are still
+# served until STALE_SECONDS, but trigger a background refresh from the provider.
+# Past STALE_SECONDS they are refetched first, and only served if that fails,
+# for up to MAX_AGE_SECONDS.
+FRESH_SECONDS = 300
+STALE_SECONDS = 24 * 60 * 60
+MAX_AGE_SECONDS = 7 * 24 * 60 * 60
+
+# cache_key -> (fetched_at, bars). Bars are stored in price_bars, so a cold
+# process rebuilds an entry from the database rather than the provider.
+memory_cache = TTLCache(maxsize=1024, ttl=MAX_AGE_SECONDS)
+_lock = threading.Lock()
+_refreshing = set()
+
+
+def cache_key(symbol, start=None, end=None):
+    """Build the cache key for a symbol and an optional date range.
+
+    start and end are dates, not request timestamps: bars are daily, so every
+    `to=now` within a day shares one entry.
+    """
+    return f"{symbol.upper()}:{start.isoformat() if start else ''}:{end.isoformat() if end else ''}"
+
+
+def get_bars(symbol, fetch, start=None, end=None):
+    """Return (bars, fetched_at) for a symbol/date range, calling fetch() only when needed.
+
+    If a synchronous fetch fails but an older entry exists, that entry is
+    returned instead; callers can tell from fetched_at how stale it is.
+    """
+    key = cache_key(symbol, start, end)
+
+    with _lock:
+        entry = memory_cache.get(key)
+
+    if entry is None:
+        bars = fetch()
+        return bars, _store(key, bars)
+
+    fetched_at, bars = entry
+    age = (datetime.utcnow() - fetched_at).total_seconds()
+    if age >= STALE_SECONDS:
+        try:
+            bars = fetch()
+        except Exception as e:
+            app.logger.warning("Serving stale historical data for %s: %s", symbol, e)
+            return bars, fetched_at
+        return bars, _store(key, bars)
+    if age >= FRESH_SECONDS:
+        _revalidate(key, symbol, fetch)
+    return bars, fetched_at
+
+
+def _store(key, bars):
+    """Cache bars and return their fetched_at."""
+    fetched_at = datetime.utcnow()
+    with _lock:
+        memory_cache[key] = (fetched_at, bars)
+    return fetched_at
+
+
+def _revalidate(key, symbol, fetch):
+    """Refresh a stale entry in the background, at most once per key at a time."""
+    with _lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+
+    def refresh():
+        try:
+            with app.app_context():
+                _store(key, fetch())
+        except Exception as e:
+            app.logger.warning("Error refreshing historical data for %s: %s", symbol, e)
+        finally:
+            with _lock:
+                _refreshing.discard(key)
+
+    threading.Thread(target=refresh, daemon=True).start()
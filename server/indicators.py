@@ -0,0 +1,291 @@
+# Standard library imports
+import math
+import threading
+from collections import deque
+
+# Remote library imports
+import numpy as np
+from sqlalchemy import func, select
+
+# Local imports
+from config import db
+from models import PriceBar
+
+SMA_PERIODS = (20, 50)
+EMA_PERIODS = (12, 26)
+RSI_PERIOD = 14
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+BOLLINGER_PERIOD, BOLLINGER_WIDTH = 20, 2.0
+VWAP_PERIOD = 20
+
+# Most series points returned by history()
+MAX_POINTS = 1000
+
+INDICATORS = ('sma', 'ema', 'rsi', 'macd', 'bollinger', 'vwap')
+
+
+# Vectorized indicators over a full history, oldest first. The first
+# period-1 values of windowed indicators are NaN.
+
+def sma(values, period):
+    """Simple moving average from a cumulative sum."""
+    result = np.full(len(values), np.nan)
+    if len(values) >= period:
+        cumsum = np.cumsum(np.insert(values, 0, 0.0))
+        result[period - 1:] = (cumsum[period:] - cumsum[:-period]) / period
+    return result
+
+
+def ema(values, period=None, alpha=None):
+    """Exponential moving average seeded with the first value.
+
+    The recurrence e[k] = d * e[k-1] + alpha * x[k] (d = 1 - alpha) is
+    evaluated in closed form, d**k * (e0 + alpha * cumsum(x[i] / d**i)), over
+    chunks short enough that d**-k cannot overflow.
+    """
+    alpha = alpha if alpha is not None else 2.0 / (period + 1)
+    decay = 1.0 - alpha
+    values = np.asarray(values, dtype=float)
+    result = np.empty(len(values))
+    chunk = max(1, int(600 / -math.log(decay))) if decay > 0 else 1
+    # Starting from e[-1] = x[0] makes e[0] = x[0]
+    previous = values[0] if len(values) else 0.0
+    for start in range(0, len(values), chunk):
+        x = values[start:start + chunk]
+        powers = decay ** np.arange(1, len(x) + 1)
+        result[start:start + len(x)] = powers * (previous + alpha * np.cumsum(x / powers))
+        previous = result[start + len(x) - 1]
+    return result
+
+
+def rsi(closes, period=RSI_PERIOD):
+    """Relative strength index with Wilder's smoothing (alpha = 1/period)."""
+    result = np.full(len(closes), np.nan)
+    if len(closes) <= period:
+        return result
+    change = np.diff(closes)
+    avg_gain = ema(np.maximum(change, 0.0), alpha=1.0 / period)
+    avg_loss = ema(np.maximum(-change, 0.0), alpha=1.0 / period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result[1:] = np.where(avg_loss == 0, 100.0, 100.0 - 100.0 / (1.0 + avg_gain / avg_loss))
+    result[:period] = np.nan
+    return result
+
+
+def macd(closes, fast=MACD_FAST, slow=MACD_SLOW, signal=MACD_SIGNAL):
+    """(macd, signal, histogram) lines."""
+    line = ema(closes, fast) - ema(closes, slow)
+    signal_line = ema(line, signal)
+    return line, signal_line, line - signal_line
+
+
+def bollinger(closes, period=BOLLINGER_PERIOD, width=BOLLINGER_WIDTH):
+    """(upper, middle, lower) bands at width population standard deviations."""
+    middle = sma(closes, period)
+    mean_square = sma(closes * closes, period)
+    std = np.sqrt(np.maximum(mean_square - middle * middle, 0.0))
+    return middle + width * std, middle, middle - width * std
+
+
+def vwap(typical, volume, period=VWAP_PERIOD):
+    """Rolling volume-weighted average of the typical price over period bars."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return sma(typical * volume, period) / sma(volume, period)
+
+
+class IndicatorState:
+    """Rolling state for one symbol, so each new bar is folded in with O(1) work.
+
+    Built once from the vectorized indicators over the stored history; after
+    that update() only touches running sums, EMAs and Wilder averages.
+    """
+
+    def __init__(self, symbol, dates, highs, lows, closes, volumes):
+        self.symbol = symbol
+        self.last_date = dates[-1]
+        typical = _typical(highs, lows, closes)
+        window = max(SMA_PERIODS + (BOLLINGER_PERIOD, VWAP_PERIOD))
+        self.closes = deque(closes[-(window + 1):], maxlen=window + 1)
+        self.pv = deque(typical[-VWAP_PERIOD:] * volumes[-VWAP_PERIOD:], maxlen=VWAP_PERIOD)
+        self.volume = deque(volumes[-VWAP_PERIOD:], maxlen=VWAP_PERIOD)
+        self.pv_sum, self.volume_sum = float(sum(self.pv)), float(sum(self.volume))
+        self.count = len(closes)
+
+        self.sums = {period: float(np.sum(closes[-period:])) for period in SMA_PERIODS + (BOLLINGER_PERIOD,)}
+        self.sum_sq = float(np.sum(closes[-BOLLINGER_PERIOD:] ** 2))
+        self.emas = {period: ema(closes, period)[-1] for period in EMA_PERIODS + (MACD_FAST, MACD_SLOW)}
+        line, signal_line, _ = macd(closes)
+        self.macd_signal = signal_line[-1]
+        change = np.diff(closes)
+        self.avg_gain = ema(np.maximum(change, 0.0), alpha=1.0 / RSI_PERIOD)[-1] if len(change) else 0.0
+        self.avg_loss = ema(np.maximum(-change, 0.0), alpha=1.0 / RSI_PERIOD)[-1] if len(change) else 0.0
+        self.values = self._values()
+
+    @classmethod
+    def from_bars(cls, symbol, rows):
+        dates, highs, lows, closes, volumes = zip(*rows)
+        return cls(symbol, list(dates), *_arrays(highs, lows, closes, volumes))
+
+    def update(self, day, high, low, close, volume):
+        """Fold in the next bar."""
+        typical = (high + low + close) / 3 if high is not None and low is not None else close
+        volume = volume or 0.0
+        previous = self.closes[-1]
+        self.closes.append(close)
+        self.count += 1
+
+        for period in self.sums:
+            self.sums[period] += close - (self.closes[-period - 1] if self.count > period else 0.0)
+        dropped = self.closes[-BOLLINGER_PERIOD - 1] if self.count > BOLLINGER_PERIOD else 0.0
+        self.sum_sq += close * close - dropped * dropped
+
+        for period in self.emas:
+            alpha = 2.0 / (period + 1)
+            self.emas[period] += alpha * (close - self.emas[period])
+        line = self.emas[MACD_FAST] - self.emas[MACD_SLOW]
+        self.macd_signal += 2.0 / (MACD_SIGNAL + 1) * (line - self.macd_signal)
+
+        change = close - previous
+        self.avg_gain += (max(change, 0.0) - self.avg_gain) / RSI_PERIOD
+        self.avg_loss += (max(-change, 0.0) - self.avg_loss) / RSI_PERIOD
+
+        if len(self.volume) == VWAP_PERIOD:
+            self.pv_sum -= self.pv[0]
+            self.volume_sum -= self.volume[0]
+        self.pv.append(typical * volume)
+        self.volume.append(volume)
+        self.pv_sum += typical * volume
+        self.volume_sum += volume
+        self.last_date = day
+        self.values = self._values()
+
+    def _values(self):
+        closes = self.closes
+        close = closes[-1]
+        previous = closes[-2] if len(closes) > 1 else close
+
+        def mean(period):
+            return self.sums[period] / period if self.count >= period else None
+
+        middle = mean(BOLLINGER_PERIOD)
+        line = self.emas[MACD_FAST] - self.emas[MACD_SLOW]
+        values = {
+            'close': close,
+            'change': close - previous,
+            'percent_change': (close - previous) / previous * 100 if previous else None,
+            'sma': {str(period): mean(period) for period in SMA_PERIODS},
+            'ema': {str(period): self.emas[period] for period in EMA_PERIODS},
+            'rsi': None,
+            'macd': {'macd': line, 'signal': self.macd_signal, 'histogram': line - self.macd_signal},
+            'bollinger': None,
+            'vwap': self.pv_sum / self.volume_sum if self.count >= VWAP_PERIOD and self.volume_sum else None,
+        }
+        if self.count > RSI_PERIOD:
+            values['rsi'] = 100.0 if self.avg_loss == 0 else 100.0 - 100.0 / (1.0 + self.avg_gain / self.avg_loss)
+        if middle is not None:
+            std = math.sqrt(max(self.sum_sq / BOLLINGER_PERIOD - middle * middle, 0.0))
+            values['bollinger'] = {
+                'upper': middle + BOLLINGER_WIDTH * std,
+                'middle': middle,
+                'lower': middle - BOLLINGER_WIDTH * std,
+            }
+        return values
+
+
+states = {}
+_lock = threading.Lock()
+
+
+def latest(symbol, names=INDICATORS):
+    """Current indicator values for symbol, or None if it has no stored bars.
+
+    The first call builds the symbol's state from its full stored history;
+    later calls only fold in bars stored since then. If bars were also stored
+    before the state's last date (a filled gap or an older backfill, in any
+    process), the stored count no longer adds up and the state is rebuilt.
+    """
+    symbol = symbol.upper()
+    with _lock:
+        state = states.get(symbol)
+
+    bars = _bars(symbol)
+    if state is not None:
+        newest, stored = db.session.execute(
+            select(func.max(PriceBar.date), func.count()).where(PriceBar.symbol == symbol)
+        ).one()
+        if newest is None:
+            return None
+        if stored != state.count or newest != state.last_date:
+            rows = db.session.execute(bars.where(PriceBar.date > state.last_date)).all()
+            if state.count + len(rows) == stored:
+                with _lock:
+                    for row in rows:
+                        # Another request may have folded them in meanwhile
+                        if row[0] > state.last_date:
+                            state.update(*row)
+            else:
+                state = None
+    if state is None:
+        rows = db.session.execute(bars).all()
+        if not rows:
+            return None
+        state = IndicatorState.from_bars(symbol, rows)
+    with _lock:
+        states[symbol] = state
+        values = state.values
+
+    result = {'symbol': symbol, 'as_of': state.last_date.isoformat()}
+    result.update({key: value for key, value in values.items() if key not in INDICATORS or key in names})
+    return result
+
+
+def history(symbol, names=INDICATORS, points=100):
+    """The last points values of each indicator series, computed over the full stored history."""
+    points = max(1, min(points, MAX_POINTS))
+    rows = db.session.execute(_bars(symbol.upper())).all()
+    if not rows:
+        return None
+    dates, highs, lows, closes, volumes = zip(*rows)
+    highs, lows, closes, volumes = _arrays(highs, lows, closes, volumes)
+
+    series = {}
+    if 'sma' in names:
+        series['sma'] = {str(period): sma(closes, period) for period in SMA_PERIODS}
+    if 'ema' in names:
+        series['ema'] = {str(period): ema(closes, period) for period in EMA_PERIODS}
+    if 'rsi' in names:
+        series['rsi'] = rsi(closes)
+    if 'macd' in names:
+        series['macd'] = dict(zip(('macd', 'signal', 'histogram'), macd(closes)))
+    if 'bollinger' in names:
+        series['bollinger'] = dict(zip(('upper', 'middle', 'lower'), bollinger(closes)))
+    if 'vwap' in names:
+        series['vwap'] = vwap(_typical(highs, lows, closes), volumes)
+
+    def tail(values):
+        if isinstance(values, dict):
+            return {key: tail(value) for key, value in values.items()}
+        values = values[-points:]
+        return np.where(np.isnan(values), None, values).tolist()
+
+    result = {'symbol': symbol.upper(), 'dates': [day.isoformat() for day in dates[-points:]]}
+    result.update({name: tail(values) for name, values in series.items()})
+    return result
+
+
+def _bars(symbol):
+    return select(
+        PriceBar.date, PriceBar.high, PriceBar.low, PriceBar.close, PriceBar.volume
+    ).where(PriceBar.symbol == symbol).order_by(PriceBar.date)
+
+
+def _arrays(highs, lows, closes, volumes):
+    to_array = lambda values: np.array([np.nan if v is None else v for v in values], dtype=float)
+    volumes = np.nan_to_num(to_array(volumes))
+    return to_array(highs), to_array(lows), to_array(closes), volumes
+
+
+def _typical(highs, lows, closes):
+    """(high + low + close) / 3, or the close where the range is missing."""
+    typical = (highs + lows + closes) / 3
+    return np.where(np.isnan(typical), closes, typical)
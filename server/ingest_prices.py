@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+
+# Standard library imports
+
+# Remote library imports
+
+# Local imports
+from app import app, fetch_historical_prices
+from models import Stock
+from price_bars import ingest_symbol
+
+if __name__ == '__main__':
+    with app.app_context():
+        print("Starting price ingestion...")
+
+        for (symbol,) in Stock.query.with_entities(Stock.symbol).all():
+            try:
+                inserted = ingest_symbol(symbol, fetch_historical_prices)
+                print(f"{symbol}: {inserted} new bars")
+            except Exception as e:
+                print(f"Error ingesting {symbol}: {str(e)}")
+
+        print("Price ingestion complete!")
@@ -0,0 +1,182 @@
+# Standard library imports
+import json
+import sys
+from datetime import date, datetime, time, timedelta
+
+# Remote library imports
+import numpy as np
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+# Local imports
+from config import db
+from models import Stock, Trade, PortfolioSnapshot
+import analytics
+
+
+class LedgerError(Exception):
+    """An attempt to change or remove a recorded trade."""
+
+
+# Trades are an append-only ledger: positions at any past moment are derived
+# from them, so a recorded trade is never updated or deleted.
+
+@event.listens_for(Trade, 'before_update')
+@event.listens_for(Trade, 'before_delete')
+def _reject_trade_change(mapper, connection, target):
+    raise LedgerError("Trades are append-only and cannot be changed or deleted.")
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _reject_bulk_trade_change(orm_execute_state):
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, 'table', None)
+        if getattr(table, 'name', None) == Trade.__tablename__:
+            raise LedgerError("Trades are append-only and cannot be changed or deleted.")
+
+
+def end_of_day(day):
+    """The first moment after day; a position "as of" day includes every trade before it."""
+    return datetime.combine(day + timedelta(days=1), time.min)
+
+
+def apply_trade(positions, stock_id, trade_type, quantity, price):
+    """Fold one trade into {stock_id: [quantity, avg_buy_price]}, as trade_service applies it."""
+    held, avg_buy_price = positions.get(stock_id, (0, 0.0))
+    if trade_type == 'buy':
+        positions[stock_id] = [held + quantity, (avg_buy_price * held + price * quantity) / (held + quantity)]
+    elif held - quantity > 0:
+        positions[stock_id] = [held - quantity, avg_buy_price]
+    else:
+        positions.pop(stock_id, None)
+
+
+def latest_snapshot(user_id, at):
+    """The user's most recent snapshot covering no trades at or after `at`: (as_of, positions)."""
+    snapshot = db.session.execute(
+        select(PortfolioSnapshot.as_of, PortfolioSnapshot.positions)
+        .where(PortfolioSnapshot.user_id == user_id, PortfolioSnapshot.as_of <= at)
+        .order_by(PortfolioSnapshot.as_of.desc())
+        .limit(1)
+    ).first()
+    if snapshot is None:
+        return None, {}
+    return snapshot.as_of, {int(stock_id): position for stock_id, position in json.loads(snapshot.positions).items()}
+
+
+def trades_between(user_id, start, end):
+    """The user's trades with start <= timestamp < end (start None: from the beginning), oldest first."""
+    stmt = select(
+        Trade.timestamp, Trade.stock_id, Trade.trade_type, Trade.quantity, Trade.price_at_trade, Trade.net_profit
+    ).where(Trade.user_id == user_id, Trade.timestamp < end)
+    if start is not None:
+        stmt = stmt.where(Trade.timestamp >= start)
+    return db.session.execute(stmt.order_by(Trade.timestamp, Trade.id)).all()
+
+
+def positions_at(user_id, at):
+    """{stock_id: [quantity, avg_buy_price]} just before `at`: latest snapshot plus the trades since."""
+    as_of, positions = latest_snapshot(user_id, at)
+    for _, stock_id, trade_type, quantity, price, _ in trades_between(user_id, as_of, at):
+        apply_trade(positions, stock_id, trade_type, quantity, price)
+    return positions
+
+
+def daily_positions(user_id, start, end):
+    """Holdings, cost basis and realized P&L at the end of each day from start to end.
+
+    Returns (days, stock_ids, quantities, cost_basis, realized_pnl) where
+    quantities is a (days x stocks) matrix and the rest are per-day totals.
+    Only the trades inside the window are read: their signed changes are
+    bucketed by day and cumulatively summed onto the position at the start,
+    so the cost is O(trades in window + days x stocks).
+    """
+    days = np.arange(np.datetime64(start), np.datetime64(end) + 1)
+    window_start = datetime.combine(start, time.min)
+    base = positions_at(user_id, window_start)
+    realized_before = db.session.execute(
+        select(func.coalesce(func.sum(Trade.net_profit), 0.0))
+        .where(Trade.user_id == user_id, Trade.timestamp < window_start)
+    ).scalar_one()
+    trades = trades_between(user_id, window_start, end_of_day(end))
+
+    stock_ids = sorted(set(base) | {trade.stock_id for trade in trades})
+    column = {stock_id: i for i, stock_id in enumerate(stock_ids)}
+    quantity_changes = np.zeros((len(days), len(stock_ids)))
+    cost_changes = np.zeros(len(days))
+    realized_changes = np.zeros(len(days))
+    if trades:
+        timestamps, trade_stocks, trade_types, quantities, prices, profits = zip(*trades)
+        day_index = (np.array(timestamps, dtype='datetime64[D]') - days[0]).astype(int)
+        buys = np.array(trade_types) == 'buy'
+        quantities, prices = np.array(quantities, dtype=float), np.array(prices, dtype=float)
+        profits = np.array([profit or 0.0 for profit in profits])
+        np.add.at(quantity_changes, (day_index, [column[stock_id] for stock_id in trade_stocks]),
+                  np.where(buys, quantities, -quantities))
+        # A sell's realized profit is (price - avg_buy_price) * quantity, so the
+        # cost it removes is quantity * price - profit
+        np.add.at(cost_changes, day_index, np.where(buys, quantities * prices, profits - quantities * prices))
+        np.add.at(realized_changes, day_index, np.where(buys, 0.0, profits))
+
+    held = np.array([base[stock_id][0] if stock_id in base else 0 for stock_id in stock_ids], dtype=float)
+    base_cost = sum(quantity * avg_buy_price for quantity, avg_buy_price in base.values())
+    return (
+        days,
+        stock_ids,
+        held + np.cumsum(quantity_changes, axis=0),
+        base_cost + np.cumsum(cost_changes),
+        realized_before + np.cumsum(realized_changes),
+    )
+
+
+def daily_values(user_id, start, end):
+    """Market value, cost basis and realized P&L of the user's holdings at each day's close.
+
+    Returns (days, market_value, cost_basis, realized_pnl) from start to end.
+    Each day uses the latest stored close on or before it; stocks without
+    stored bars contribute no market value.
+    """
+    days, stock_ids, quantities, cost_basis, realized_pnl = daily_positions(user_id, start, end)
+    market_value = np.zeros(len(days))
+    if not stock_ids:
+        return days, market_value, cost_basis, realized_pnl
+
+    symbols = dict(db.session.execute(select(Stock.id, Stock.symbol).where(Stock.id.in_(stock_ids))).all())
+    columns = [symbols.get(stock_id) for stock_id in stock_ids]
+    # Look back far enough to find a close for days that start on a weekend or holiday
+    bar_dates, closes = analytics.load_closes(columns, start - timedelta(days=7))
+    if len(bar_dates):
+        latest_bar = np.searchsorted(bar_dates, days, side='right') - 1
+        prices = np.where((latest_bar >= 0)[:, None], closes[np.maximum(latest_bar, 0)], np.nan)
+        market_value = np.nansum(quantities * prices, axis=1)
+    return days, market_value, cost_basis, realized_pnl
+
+
+def take_snapshots(as_of=None):
+    """Checkpoint every trading user's positions as of midnight (UTC) starting as_of (default today).
+
+    Each snapshot is built from the user's previous snapshot plus the trades
+    since, so a nightly run only replays that day's trades. Users who already
+    have a snapshot at as_of are skipped. Returns the number written.
+    """
+    at = datetime.combine(as_of or date.today(), time.min)
+    users = db.session.execute(
+        select(Trade.user_id).where(Trade.timestamp < at).distinct()
+        .except_(select(PortfolioSnapshot.user_id).where(PortfolioSnapshot.as_of == at))
+    ).scalars().all()
+    for user_id in users:
+        db.session.add(PortfolioSnapshot(
+            user_id=user_id,
+            as_of=at,
+            positions=json.dumps(positions_at(user_id, at))
+        ))
+    db.session.commit()
+    return len(users)
+
+
+if __name__ == '__main__':
+    from app import app
+
+    with app.app_context():
+        as_of = date.fromisoformat(sys.argv[1]) if len(sys.argv) > 1 else None
+        print(f"Wrote {take_snapshots(as_of)} portfolio snapshots")
@@ -0,0 +1,189 @@
+# Standard library imports
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+# Remote library imports
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+load_dotenv()
+
+DEFAULT_HOST = "apidojo-yahoo-finance-v1.p.rapidapi.com"
+
+# Upstream statuses worth retrying; anything else is returned or raised as-is
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class MarketDataError(Exception):
+    """The market-data provider could not be reached or returned an error."""
+
+
+class ProviderUnavailable(MarketDataError):
+    """The circuit breaker is open, so the provider was not called."""
+
+
+class UpstreamFailure(MarketDataError):
+    """The provider was unreachable, timed out or kept answering 429/5xx."""
+
+
+class CircuitBreaker:
+    """Fail fast after repeated provider failures or slow calls.
+
+    Closed: calls go through. After failure_threshold consecutive failures
+    (a call slower than slow_call_seconds counts as one; a 4xx answer other
+    than 429 does not, since the provider is up) the breaker opens and
+    rejects calls for reset_timeout seconds. It then lets a single trial call
+    through (half-open); success closes it again, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold=5, slow_call_seconds=5.0, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    def _state(self):
+        if self._opened_at is None:
+            return 'closed'
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def before_call(self):
+        """Raise ProviderUnavailable unless a call may go upstream now."""
+        with self._lock:
+            state = self._state()
+            if state == 'open' or (state == 'half_open' and self._trial_in_flight):
+                raise ProviderUnavailable("Market data provider circuit is open")
+            if state == 'half_open':
+                self._trial_in_flight = True
+
+    def after_call(self, elapsed, failed):
+        """Record the outcome of a call that before_call() allowed."""
+        with self._lock:
+            self._trial_in_flight = False
+            if failed or elapsed >= self.slow_call_seconds:
+                self._failures += 1
+                if self._opened_at is not None or self._failures >= self.failure_threshold:
+                    self._opened_at = time.monotonic()
+            else:
+                self._failures = 0
+                self._opened_at = None
+
+
+class MarketDataClient:
+    """Pooled, keep-alive client for the RapidAPI Yahoo Finance endpoints.
+
+    Concurrent calls for the same resource share one upstream request.
+    """
+
+    def __init__(self, base_url, api_key, api_host, connect_timeout=3.05, read_timeout=10.0,
+                 retries=2, backoff=0.25, pool_size=20, breaker=None):
+        self.base_url = base_url.rstrip('/')
+        self.breaker = breaker or CircuitBreaker()
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({'x-rapidapi-key': api_key or '', 'x-rapidapi-host': api_host})
+
+        self._lock = threading.Lock()
+        self._inflight = {}
+
+    def get_historical_prices(self, symbol):
+        """Daily bars for symbol, skipping entries without a close (dividends, splits)."""
+        def fetch():
+            data = self._get('/stock/v3/get-historical-data', {'symbol': symbol, 'region': 'US'})
+            return [item for item in data.get('prices', []) if item.get('close') is not None]
+        return self._single_flight(('historical', symbol.upper()), fetch)
+
+    def get_quote(self, symbol):
+        """Latest regular-market price for symbol, or None if the provider has none."""
+        def fetch():
+            data = self._get('/stock/v3/get-quote', {'symbol': symbol, 'region': 'US'})
+            results = data.get('quoteResponse', {}).get('result', [])
+            return results[0].get('regularMarketPrice') if results else None
+        return self._single_flight(('quote', symbol.upper()), fetch)
+
+    def _get(self, path, params):
+        """GET through the circuit breaker. Every call before_call() allows is recorded, however it ends."""
+        self.breaker.before_call()
+        started = time.monotonic()
+        failed = False
+        try:
+            return self._get_with_retries(path, params)
+        except UpstreamFailure:
+            failed = True
+            raise
+        finally:
+            self.breaker.after_call(time.monotonic() - started, failed=failed)
+
+    def _get_with_retries(self, path, params):
+        """GET with connect/read timeouts and bounded, jittered retries."""
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.session.get(self.base_url + path, params=params, timeout=self.timeout)
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    return response.json()
+                error = UpstreamFailure(f"Provider returned {response.status_code} for {path}")
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+                error = UpstreamFailure(f"Provider request to {path} failed: {e}")
+            except (requests.HTTPError, ValueError) as e:
+                raise MarketDataError(f"Provider request to {path} failed: {e}") from e
+            except requests.RequestException as e:
+                # Anything else requests can raise (undecodable content, bad URLs, ...)
+                raise MarketDataError(f"Provider request to {path} failed: {e}") from e
+
+            if attempt < self.retries:
+                # Full jitter keeps retries from many workers from arriving in lockstep
+                time.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+        raise error
+
+    def _single_flight(self, key, fetch):
+        """Run fetch() once for all concurrent callers asking for the same key."""
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fetch()
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+
+client = MarketDataClient(
+    base_url=os.getenv("MARKET_DATA_BASE_URL", f"https://{DEFAULT_HOST}"),
+    api_key=os.getenv("RAPIDAPI_KEY"),
+    api_host=os.getenv("RAPID_API_HOST") or os.getenv("RAPIDAPI_HOST") or DEFAULT_HOST,
+    connect_timeout=float(os.getenv("MARKET_DATA_CONNECT_TIMEOUT", 3.05)),
+    read_timeout=float(os.getenv("MARKET_DATA_READ_TIMEOUT", 10)),
+    retries=int(os.getenv("MARKET_DATA_RETRIES", 2)),
+    breaker=CircuitBreaker(
+        failure_threshold=int(os.getenv("MARKET_DATA_BREAKER_FAILURES", 5)),
+        slow_call_seconds=float(os.getenv("MARKET_DATA_BREAKER_SLOW_SECONDS", 5)),
+        reset_timeout=float(os.getenv("MARKET_DATA_BREAKER_RESET_SECONDS", 30)),
+    ),
+)
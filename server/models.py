@@ -39,6 +39,11 @@ class Stock(db.Model, SerializerMixin):
 
 class Portfolio(db.Model, SerializerMixin):
     __tablename__ = 'portfolios'
+    __table_args__ = (
+        db.Index('ix_portfolios_user_id_stock_id', 'user_id', 'stock_id', unique=True),
+        db.Index('ix_portfolios_stock_id', 'stock_id'),
+        db.Index('ix_portfolios_quantity', 'quantity'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -50,6 +55,9 @@ class Portfolio(db.Model, SerializerMixin):
     net_profit_loss = db.Column(db.Float, default=0.0)
     volatility = db.Column(db.Float, default=0.0)
     sharpe_ratio = db.Column(db.Float, default=0.0)
+    sortino_ratio = db.Column(db.Float, default=0.0)
+    max_drawdown = db.Column(db.Float, default=0.0)
+    beta = db.Column(db.Float, default=0.0)
     dividend_yield = db.Column(db.Float, default=0.0)
     sector = db.Column(db.String(50))
     asset_class = db.Column(db.String(50))
@@ -58,37 +66,12 @@ class Portfolio(db.Model, SerializerMixin):
     stock = db.relationship('Stock', back_populates='portfolios', overlaps="portfolio_entries,stock_entry")
     user = db.relationship('User', back_populates='portfolios', overlaps="user_portfolios")
 
-    def update_after_trade(self, trade):
-        """Update the portfolio based on a trade."""
-        if trade.trade_type == 'buy':
-            total_cost = (self.avg_buy_price * self.quantity) + (trade.price_at_trade * trade.quantity)
-            self.quantity += trade.quantity
-            self.avg_buy_price = total_cost / self.quantity
-
-        elif trade.trade_type == 'sell':
-            profit = (trade.price_at_trade - self.avg_buy_price) * trade.quantity
-            self.net_profit_loss += profit
-            self.quantity -= trade.quantity
-
-            if self.quantity == 0:
-                db.session.delete(self)
-                db.session.commit()
-                return
-
-        # Update the current_value and net_profit_loss
-        self.current_value = self.quantity * self.stock.current_price
-        self.net_profit_loss = (self.stock.current_price - self.avg_buy_price) * self.quantity
-        db.session.commit()
-
-    @property
-    def calculate_sharpe_ratio(self, risk_free_rate=0.01):
-        """Calculate the Sharpe ratio for the portfolio."""
-        if self.volatility > 0:
-            return (self.net_profit_loss - self.initial_capital) / self.volatility
-        return 0.0
-
 class Trade(db.Model, SerializerMixin):
     __tablename__ = 'trades'
+    __table_args__ = (
+        db.Index('ix_trades_user_id_timestamp', 'user_id', 'timestamp'),
+        db.Index('ix_trades_stock_id', 'stock_id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -102,8 +85,55 @@ class Trade(db.Model, SerializerMixin):
     stock = db.relationship('Stock', back_populates='trades', overlaps="stock_trade,trades")
     user = db.relationship('User', back_populates='trades', overlaps="user_trader,user_trades")
 
-    def calculate_net_profit(self, portfolio):
-        """Calculate profit or loss for a sell trade."""
-        if self.trade_type == 'sell':
-            self.net_profit = (self.price_at_trade - portfolio.avg_buy_price) * self.quantity
-            db.session.commit()
+class PriceBar(db.Model, SerializerMixin):
+    __tablename__ = 'price_bars'
+    __table_args__ = (
+        db.Index('ix_price_bars_symbol_date', 'symbol', 'date', unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    symbol = db.Column(db.String(10), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    open = db.Column(db.Float)
+    high = db.Column(db.Float)
+    low = db.Column(db.Float)
+    close = db.Column(db.Float, nullable=False)
+    volume = db.Column(db.BigInteger)
+
+class PortfolioSummary(db.Model, SerializerMixin):
+    __tablename__ = 'portfolio_summaries'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    market_value = db.Column(db.Float, nullable=False, default=0.0)
+    cost_basis = db.Column(db.Float, nullable=False, default=0.0)
+    realized_pnl = db.Column(db.Float, nullable=False, default=0.0)
+    holdings = db.Column(db.Integer, nullable=False, default=0)
+
+class DataVersion(db.Model, SerializerMixin):
+    __tablename__ = 'data_versions'
+
+    # 'stocks' for prices, 'user:<id>' for a user's positions and trades
+    key = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+class PortfolioSnapshot(db.Model, SerializerMixin):
+    __tablename__ = 'portfolio_snapshots'
+    __table_args__ = (
+        db.Index('ix_portfolio_snapshots_user_id_as_of', 'user_id', 'as_of', unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    # Covers every trade with timestamp < as_of
+    as_of = db.Column(db.DateTime, nullable=False)
+    positions = db.Column(db.Text, nullable=False)  # JSON {stock_id: [quantity, avg_buy_price]}
+
+class PortfolioDaily(db.Model, SerializerMixin):
+    __tablename__ = 'portfolio_daily'
+
+    # The primary key doubles as the index that history ranges are read from
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    date = db.Column(db.Date, primary_key=True)
+    market_value = db.Column(db.Float, nullable=False)
+    cost_basis = db.Column(db.Float, nullable=False)
+    realized_pnl = db.Column(db.Float, nullable=False)
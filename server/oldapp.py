@@ -13,6 +13,7 @@ import ipdb
 
 from config import app, db, api
 from models import User, Stock, Portfolio, Trade, StockTicker
+import market_data
 
 load_dotenv()
 
@@ -63,18 +64,8 @@ def fetch_stock_price(symbol):
         print(f"Returning cached price for {symbol}")
         return price_cache[symbol]  # Return cached price
 
-    url = "https://apidojo-yahoo-finance-v1.p.rapidapi.com/stock/v3/get-quote"
-    headers = {
-        "x-rapidapi-key": RAPID_API_KEY,
-        "x-rapidapi-host": RAPID_API_HOST
-    }
-    params = {"symbol": symbol, "region": "US"}
-
     try:
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        data = response.json()
-        price = data['quoteResponse']['result'][0].get('regularMarketPrice')
+        price = market_data.client.get_quote(symbol)
         if price:
             price_cache[symbol] = price  # Cache the price
             return price
@@ -0,0 +1,264 @@
+# Standard library imports
+import heapq
+import itertools
+import threading
+from contextlib import contextmanager
+
+# Local imports
+import trade_service
+
+
+class Order:
+    """A resting limit order. quantity is what is still open."""
+    __slots__ = ('id', 'user_id', 'stock_id', 'side', 'limit_price', 'quantity', 'active')
+
+    def __init__(self, id, user_id, stock_id, side, limit_price, quantity):
+        self.id = id
+        self.user_id = user_id
+        self.stock_id = stock_id
+        self.side = side
+        self.limit_price = limit_price
+        self.quantity = quantity
+        self.active = True
+
+    def to_dict(self):
+        return {'id': self.id, 'stock_id': self.stock_id, 'side': self.side,
+                'limit_price': self.limit_price, 'quantity': self.quantity}
+
+
+class OrderBook:
+    """Bids and asks for one stock, matched with price-time priority.
+
+    Each side is a heap keyed on (price, order id); ids increase with arrival
+    time, so inserting is O(log n). Cancelling only flags the order; flagged
+    orders are skipped and popped when they reach the top of the heap.
+
+    Every cross is handed to a settle callback before the book changes. It
+    returns the order it could not fill (a seller who no longer holds the
+    shares), or None. An unfillable order is cancelled and neither side of
+    that cross happens.
+    """
+
+    def __init__(self):
+        self.bids = []  # (-limit_price, id, order)
+        self.asks = []  # (limit_price, id, order)
+
+    def add(self, order, settle):
+        """Match an incoming order against the opposite side at the resting orders' prices, resting any remainder."""
+        opposite = self.asks if order.side == 'buy' else self.bids
+        while order.quantity:
+            best = self._best(opposite)
+            if best is None or not self._crosses(order, best.limit_price):
+                break
+            quantity = min(order.quantity, best.quantity)
+            failed = settle([(order, quantity, best.limit_price), (best, quantity, best.limit_price)])
+            if failed is not None:
+                self._cancel(failed)
+                if failed is order:
+                    return
+                continue
+            _journal.save(self, order)
+            order.quantity -= quantity
+            self._reduce(best, quantity, opposite)
+
+        if order.quantity:
+            if order.side == 'buy':
+                heapq.heappush(self.bids, (-order.limit_price, order.id, order))
+            else:
+                heapq.heappush(self.asks, (order.limit_price, order.id, order))
+        else:
+            self._cancel(order)
+
+    def match_market(self, price, settle):
+        """Fill every resting order the market price has moved through, at that price."""
+        for side in (self.bids, self.asks):
+            while True:
+                best = self._best(side)
+                if best is None or not self._crosses(best, price):
+                    break
+                if settle([(best, best.quantity, price)]) is not None:
+                    self._cancel(best)
+                    continue
+                self._reduce(best, best.quantity, side)
+
+    def rebuild(self, orders):
+        """Re-rest the active ones among orders and the orders already in the heaps."""
+        resting = {entry[2] for entry in self.bids + self.asks} | set(orders)
+        self.bids = [(-order.limit_price, order.id, order)
+                     for order in resting if order.active and order.side == 'buy']
+        self.asks = [(order.limit_price, order.id, order)
+                     for order in resting if order.active and order.side == 'sell']
+        heapq.heapify(self.bids)
+        heapq.heapify(self.asks)
+
+    @staticmethod
+    def _crosses(order, price):
+        return price <= order.limit_price if order.side == 'buy' else price >= order.limit_price
+
+    @staticmethod
+    def _best(side):
+        while side and not side[0][2].active:
+            heapq.heappop(side)
+        return side[0][2] if side else None
+
+    def _reduce(self, order, quantity, side):
+        _journal.save(self, order)
+        order.quantity -= quantity
+        if not order.quantity:
+            order.active = False
+            heapq.heappop(side)
+
+    def _cancel(self, order):
+        _journal.save(self, order)
+        order.active = False
+
+
+class Journal:
+    """Undo log for the book changes made while their fills are settled in an open database transaction."""
+
+    def __init__(self):
+        self.saved = {}  # order -> (book, quantity, active) before the transaction
+        self.new = set()
+        self.committed = False
+
+    def save(self, book, order):
+        if order not in self.saved:
+            self.saved[order] = (book, order.quantity, order.active)
+
+    def commit(self):
+        """Keep the book changes; call once the database transaction has committed."""
+        self.committed = True
+
+    def undo(self):
+        for order, (_, quantity, active) in self.saved.items():
+            order.quantity, order.active = quantity, active and order not in self.new
+        for book in {book for book, _, _ in self.saved.values()}:
+            book.rebuild(order for order, (saved_book, _, _) in self.saved.items() if saved_book is book)
+        for order in self.saved:
+            if order.active:
+                orders[order.id] = order
+            else:
+                orders.pop(order.id, None)
+
+
+books = {}
+orders = {}  # order id -> Order, for every open order
+_ids = itertools.count(1)
+# Serializes everything that reads or changes the books. Taken before the
+# database write lock wherever both are needed.
+_lock = threading.RLock()
+_journal = None
+
+
+@contextmanager
+def transaction():
+    """Hold the books while matched fills are settled, and keep the changes only if committed.
+
+    Usage: with transaction() as journal: ... db.session.commit(); journal.commit().
+    Leaving the block any other way (an exception, a rollback, an early
+    return) puts every order back as it was.
+    """
+    global _journal
+    with _lock:
+        journal = _journal = Journal()
+        try:
+            yield journal
+        finally:
+            _journal = None
+            if not journal.committed:
+                journal.undo()
+
+
+def book_for(stock_id):
+    book = books.get(stock_id)
+    if book is None:
+        book = books[stock_id] = OrderBook()
+    return book
+
+
+def submit(user_id, stock_id, side, quantity, limit_price, market_price=None):
+    """Place a limit order and settle what it matches. Runs inside transaction(); does not commit.
+
+    Returns (order, settled, rejected).
+    """
+    _require_transaction()
+    order = Order(next(_ids), user_id, stock_id, side, limit_price, quantity)
+    book = book_for(stock_id)
+    _journal.save(book, order)
+    _journal.new.add(order)
+    settled, rejected = [], []
+    settle = _settler(settled, rejected)
+    book.add(order, settle)
+    if market_price is not None and order.active:
+        book.match_market(market_price, settle)
+    if order.active:
+        orders[order.id] = order
+    _forget_inactive()
+    return order, settled, rejected
+
+
+def cancel(order_id, user_id):
+    """Cancel an open order owned by user_id. Returns the order, or None."""
+    with _lock:
+        order = orders.get(order_id)
+        if order is None or order.user_id != user_id or not order.active:
+            return None
+        order.active = False
+        orders.pop(order_id, None)
+    return order
+
+
+def open_orders(user_id):
+    return [order for order in list(orders.values()) if order.user_id == user_id]
+
+
+def reserved(user_id, stock_id):
+    """Shares the user's open sell orders in stock_id could still sell."""
+    return sum(order.quantity for order in list(orders.values())
+               if order.user_id == user_id and order.stock_id == stock_id and order.side == 'sell')
+
+
+def match_prices(prices):
+    """Settle resting orders crossed by {stock_id: new_price}. Runs inside transaction(); does not commit.
+
+    Returns (settled, rejected).
+    """
+    _require_transaction()
+    settled, rejected = [], []
+    settle = _settler(settled, rejected)
+    for stock_id, price in prices.items():
+        book = books.get(stock_id)
+        if book is not None:
+            book.match_market(price, settle)
+    _forget_inactive()
+    return settled, rejected
+
+
+def _settler(settled, rejected):
+    """A settle callback for OrderBook that persists each cross as trades, collecting the results."""
+    def settle(legs):
+        # Only a sell can be refused, so it goes first and a refusal leaves nothing half-applied
+        legs = sorted(legs, key=lambda leg: leg[0].side != 'sell')
+        for i, (order, quantity, price) in enumerate(legs):
+            try:
+                trade_service.execute_trade(order.user_id, order.stock_id, order.side, quantity, price)
+            except trade_service.TradeError as e:
+                if i:
+                    raise
+                rejected.append({'order_id': order.id, 'error': e.message})
+                return order
+        settled.extend({'order_id': order.id, 'side': order.side, 'quantity': quantity, 'price': price}
+                       for order, quantity, price in legs)
+        return None
+    return settle
+
+
+def _require_transaction():
+    if _journal is None:
+        raise RuntimeError("Order matching must run inside order_book.transaction().")
+
+
+def _forget_inactive():
+    for order in _journal.saved:
+        if not order.active:
+            orders.pop(order.id, None)
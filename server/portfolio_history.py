@@ -0,0 +1,94 @@
+# Standard library imports
+import sys
+from datetime import date
+
+# Remote library imports
+from sqlalchemy import delete, func, insert, select
+
+# Local imports
+from config import db
+from models import PortfolioDaily, Trade
+import ledger
+
+INTERVALS = ('day', 'week', 'month')
+
+# Longest range history() returns, in days
+MAX_DAYS = 366 * 10
+
+
+def rollup_user(user_id, start, end):
+    """Recompute and store the user's daily rows from start to end. Does not commit."""
+    days, market_value, cost_basis, realized_pnl = ledger.daily_values(user_id, start, end)
+    db.session.execute(
+        delete(PortfolioDaily)
+        .where(PortfolioDaily.user_id == user_id, PortfolioDaily.date.between(start, end))
+        .execution_options(synchronize_session=False)
+    )
+    rows = [
+        {'user_id': user_id, 'date': day, 'market_value': value, 'cost_basis': cost, 'realized_pnl': realized}
+        for day, value, cost, realized in zip(
+            days.tolist(), market_value.tolist(), cost_basis.tolist(), realized_pnl.tolist()
+        )
+    ]
+    if rows:
+        db.session.execute(insert(PortfolioDaily), rows)
+    return len(rows)
+
+
+def rollup(end=None, rebuild=False):
+    """Bring every trading user's daily rows up to end (default today) and commit.
+
+    Each user resumes from their last stored day, which is recomputed in case
+    it was rolled up before that day's close was stored; users without rows,
+    or every user with rebuild=True, start from their first trade. Returns
+    the number of rows written.
+    """
+    end = end or date.today()
+    first_trade = dict(db.session.execute(
+        select(Trade.user_id, func.min(Trade.timestamp))
+        .where(Trade.timestamp < ledger.end_of_day(end))
+        .group_by(Trade.user_id)
+    ).all())
+    last_rolled = {} if rebuild else dict(db.session.execute(
+        select(PortfolioDaily.user_id, func.max(PortfolioDaily.date)).group_by(PortfolioDaily.user_id)
+    ).all())
+
+    written = 0
+    for user_id, first in first_trade.items():
+        start = min(last_rolled.get(user_id) or first.date(), end)
+        written += rollup_user(user_id, start, end)
+        db.session.commit()
+    return written
+
+
+def history(user_id, start, end, interval='day'):
+    """Stored daily rows from start to end as columns, keeping each week's or month's last day for coarser intervals."""
+    rows = db.session.execute(
+        select(PortfolioDaily.date, PortfolioDaily.market_value, PortfolioDaily.cost_basis, PortfolioDaily.realized_pnl)
+        .where(PortfolioDaily.user_id == user_id, PortfolioDaily.date.between(start, end))
+        .order_by(PortfolioDaily.date)
+    ).all()
+    if interval != 'day':
+        period = (lambda day: day.isocalendar()[:2]) if interval == 'week' else (lambda day: (day.year, day.month))
+        rows = [row for row, following in zip(rows, rows[1:] + [None])
+                if following is None or period(following.date) != period(row.date)]
+
+    return {
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'interval': interval,
+        'dates': [row.date.isoformat() for row in rows],
+        'market_value': [row.market_value for row in rows],
+        'cost_basis': [row.cost_basis for row in rows],
+        'unrealized_pnl': [row.market_value - row.cost_basis for row in rows],
+        'realized_pnl': [row.realized_pnl for row in rows],
+    }
+
+
+if __name__ == '__main__':
+    from app import app
+
+    with app.app_context():
+        args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+        end = date.fromisoformat(args[0]) if args else None
+        print(f"Wrote {rollup(end, rebuild='--rebuild' in sys.argv)} daily portfolio rows")
@@ -0,0 +1,157 @@
+# Standard library imports
+import sys
+from collections import namedtuple
+
+# Remote library imports
+from sqlalchemy import func, select, update
+
+# Local imports
+from config import db
+from db_helpers import insert_ignoring_conflict
+import database
+from models import Stock, Portfolio, PortfolioSummary, Trade
+
+# The columns of a position that feed the summary
+Position = namedtuple('Position', ['quantity', 'avg_buy_price', 'current_value'])
+
+TOLERANCE = 1e-6
+
+
+def compute_summary(user_id):
+    """Rebuild a user's totals from their Portfolio and Trade rows."""
+    market_value, cost_basis, holdings = db.session.execute(
+        select(
+            func.coalesce(func.sum(Portfolio.current_value), 0.0),
+            func.coalesce(func.sum(Portfolio.avg_buy_price * Portfolio.quantity), 0.0),
+            func.count(Portfolio.id)
+        ).where(Portfolio.user_id == user_id, Portfolio.quantity > 0)
+    ).one()
+    realized_pnl = db.session.execute(
+        select(func.coalesce(func.sum(Trade.net_profit), 0.0)).where(Trade.user_id == user_id)
+    ).scalar_one()
+    return {
+        'user_id': user_id,
+        'market_value': market_value,
+        'cost_basis': cost_basis,
+        'realized_pnl': realized_pnl,
+        'holdings': holdings,
+    }
+
+
+def ensure_summary(user_id):
+    """Create the user's summary row from scratch if it does not exist yet.
+
+    The rebuild reads from the primary under its write lock, since a replica
+    may not have the user's latest trades yet.
+    """
+    if db.session.get(PortfolioSummary, user_id) is None:
+        database.lock_for_write(db.session)
+        db.session.execute(insert_ignoring_conflict(PortfolioSummary, compute_summary(user_id), ['user_id']))
+
+
+def lock_summary(user_id):
+    """Create the user's summary row if needed and lock it until the transaction ends.
+
+    Every trade of the user locks it first, so on databases with row locks a
+    user's trades run one at a time even when they open new positions.
+    """
+    ensure_summary(user_id)
+    db.session.execute(
+        select(PortfolioSummary.user_id).where(PortfolioSummary.user_id == user_id).with_for_update()
+    )
+
+
+def record_change(user_id, before, after, realized_pnl=0.0):
+    """Apply the difference between two sets of a user's positions to their summary.
+
+    before/after hold the touched positions (anything with quantity,
+    avg_buy_price and current_value) as they were and as they are now.
+    """
+    def totals(positions):
+        return (
+            sum(p.current_value or 0.0 for p in positions),
+            sum(p.avg_buy_price * p.quantity for p in positions),
+            sum(1 for p in positions if p.quantity > 0),
+        )
+
+    old_value, old_cost, old_holdings = totals(before)
+    new_value, new_cost, new_holdings = totals(after)
+    db.session.execute(
+        update(PortfolioSummary)
+        .where(PortfolioSummary.user_id == user_id)
+        .values(
+            market_value=PortfolioSummary.market_value + (new_value - old_value),
+            cost_basis=PortfolioSummary.cost_basis + (new_cost - old_cost),
+            realized_pnl=PortfolioSummary.realized_pnl + realized_pnl,
+            holdings=PortfolioSummary.holdings + (new_holdings - old_holdings)
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def record_revaluation(stock_ids):
+    """Move summaries by the value change of holdings in stock_ids.
+
+    Must run after the stocks' new prices are written and before the
+    holdings' current_value is revalued, in the same transaction.
+    """
+    change = (
+        select(func.coalesce(func.sum(Portfolio.quantity * Stock.current_price - func.coalesce(Portfolio.current_value, 0.0)), 0.0))
+        .join(Stock, Stock.id == Portfolio.stock_id)
+        .where(Portfolio.user_id == PortfolioSummary.user_id, Portfolio.stock_id.in_(stock_ids))
+        .scalar_subquery()
+    )
+    holders = select(Portfolio.user_id).where(Portfolio.stock_id.in_(stock_ids))
+    db.session.execute(
+        update(PortfolioSummary)
+        .where(PortfolioSummary.user_id.in_(holders))
+        .values(market_value=PortfolioSummary.market_value + change)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def to_dict(summary):
+    return {
+        'market_value': summary.market_value,
+        'cost_basis': summary.cost_basis,
+        'unrealized_pnl': summary.market_value - summary.cost_basis,
+        'realized_pnl': summary.realized_pnl,
+        'holdings': summary.holdings,
+    }
+
+
+def check_summaries(fix=False):
+    """Rebuild every stored summary from scratch and return the ones that drifted.
+
+    With fix=True the drifted rows are overwritten with the rebuilt values.
+    """
+    drifted = []
+    for summary in PortfolioSummary.query.all():
+        expected = compute_summary(summary.user_id)
+        diff = {
+            column: (getattr(summary, column), value)
+            for column, value in expected.items()
+            if abs(getattr(summary, column) - value) > TOLERANCE * max(1.0, abs(value))
+        }
+        if diff:
+            drifted.append({'user_id': summary.user_id, 'diff': diff})
+            if fix:
+                for column, value in expected.items():
+                    setattr(summary, column, value)
+    if fix:
+        db.session.commit()
+    return drifted
+
+
+if __name__ == '__main__':
+    from app import app
+
+    with app.app_context():
+        fix = '--fix' in sys.argv
+        drifted = check_summaries(fix=fix)
+        for entry in drifted:
+            print(f"user {entry['user_id']}: " + ", ".join(
+                f"{column} stored={stored} expected={expected}"
+                for column, (stored, expected) in entry['diff'].items()
+            ))
+        print(f"{len(drifted)} summaries {'fixed' if fix else 'out of sync'}")
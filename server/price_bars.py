@@ -0,0 +1,177 @@
+# Standard library imports
+import calendar
+import threading
+from datetime import datetime, timedelta
+
+# Remote library imports
+import numpy as np
+from cachetools import TTLCache
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+# Local imports
+from config import db
+from models import PriceBar
+
+# How far back to backfill a symbol that has no stored bars yet
+DEFAULT_HISTORY_DAYS = 365
+
+# Without a market calendar a weekday holiday looks like a missing bar. Runs of
+# up to this many missing weekdays inside the stored series are taken to be
+# closures (US exchanges rarely close more than one weekday in a row); longer
+# runs are refetched.
+MAX_CLOSED_WEEKDAYS = 2
+
+# Ranges asked of the provider in the last RETRY_SECONDS are not asked again.
+# A range it has no bars for (a holiday at the end of the series, dates before
+# the listing, an unknown symbol) stays missing, and would otherwise be
+# refetched on every request.
+RETRY_SECONDS = 6 * 60 * 60
+recently_asked = TTLCache(maxsize=10000, ttl=RETRY_SECONDS)
+_asked_lock = threading.Lock()
+
+# Symbols gap-filled through refresh_symbol in the last REFRESH_SECONDS
+REFRESH_SECONDS = 5 * 60
+recently_refreshed = TTLCache(maxsize=10000, ttl=REFRESH_SECONDS)
+
+
+def to_epoch(day):
+    """Convert a date to epoch seconds at midnight UTC."""
+    return calendar.timegm(day.timetuple())
+
+
+def from_epoch(ts):
+    """Convert provider epoch seconds to a UTC date."""
+    return datetime.utcfromtimestamp(ts).date()
+
+
+def utc_today():
+    """Today's date in UTC, the calendar bars are stored in."""
+    return datetime.utcnow().date()
+
+
+def last_session(day):
+    """Most recent weekday strictly before the given day."""
+    day -= timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day
+
+
+def missing_ranges(symbol, start=None, end=None):
+    """Return the (start, end) date ranges of completed sessions for which symbol has no stored bars.
+
+    Today's bar is still forming, so end is capped at the last completed
+    session. Gaps inside the stored series are reported when they span more
+    than MAX_CLOSED_WEEKDAYS weekdays.
+    """
+    end = min(end or utc_today(), last_session(utc_today()))
+    stmt = select(PriceBar.date).where(PriceBar.symbol == symbol, PriceBar.date <= end)
+    if start is not None:
+        if start > end:
+            return []
+        # The stored bar just before start tells whether start falls in a gap
+        before = db.session.execute(
+            select(PriceBar.date).where(PriceBar.symbol == symbol, PriceBar.date < start)
+            .order_by(PriceBar.date.desc()).limit(1)
+        ).scalar()
+        stmt = stmt.where(PriceBar.date >= (before or start))
+    days = db.session.execute(stmt.order_by(PriceBar.date)).scalars().all()
+
+    if not days:
+        return [(start or end - timedelta(days=DEFAULT_HISTORY_DAYS), end)]
+
+    ranges = []
+    if start is not None and start < days[0]:
+        ranges.append((start, days[0] - timedelta(days=1)))
+    stored = np.array(days, dtype='datetime64[D]')
+    closed = np.busday_count(stored[:-1] + 1, stored[1:])
+    for i in np.flatnonzero(closed > MAX_CLOSED_WEEKDAYS):
+        ranges.append((days[i] + timedelta(days=1), days[i + 1] - timedelta(days=1)))
+    if days[-1] < last_session(end + timedelta(days=1)):
+        ranges.append((days[-1] + timedelta(days=1), end))
+    return ranges
+
+
+def ingest_symbol(symbol, fetch, start=None, end=None):
+    """Fetch the missing date ranges for symbol in one provider call and bulk-insert their bars.
+
+    fetch(symbol, start_epoch, end_epoch) must return provider-style bars.
+    Ranges asked for within RETRY_SECONDS are skipped. Returns the number of
+    bars inserted.
+    """
+    symbol = symbol.upper()
+    with _asked_lock:
+        ranges = [(lo, hi) for lo, hi in missing_ranges(symbol, start, end)
+                  if (symbol, lo, hi) not in recently_asked]
+    if not ranges:
+        return 0
+
+    # One request spanning every gap: the provider serves whole histories, so
+    # a request per range would repeat the same download
+    bars = fetch(symbol, to_epoch(ranges[0][0]), to_epoch(ranges[-1][1]) + 86399)
+    with _asked_lock:
+        for lo, hi in ranges:
+            recently_asked[(symbol, lo, hi)] = True
+    rows = {}
+    for bar in bars:
+        day = from_epoch(bar['date'])
+        if not any(lo <= day <= hi for lo, hi in ranges):
+            continue
+        rows[day] = {
+            'symbol': symbol,
+            'date': day,
+            'open': bar.get('open'),
+            'high': bar.get('high'),
+            'low': bar.get('low'),
+            'close': bar['close'],
+            'volume': bar.get('volume'),
+        }
+
+    if not rows:
+        return 0
+    try:
+        db.session.execute(insert(PriceBar), list(rows.values()))
+        db.session.commit()
+    except IntegrityError:
+        # Another worker filled the same gap first
+        db.session.rollback()
+        return 0
+    return len(rows)
+
+
+def refresh_symbol(symbol, fetch):
+    """Gap-fill symbol up to the last session, at most once per REFRESH_SECONDS.
+
+    For callers that read stored bars on every request and only need them
+    kept current. Returns the number of bars inserted.
+    """
+    symbol = symbol.upper()
+    with _asked_lock:
+        if symbol in recently_refreshed:
+            return 0
+        # Marked before fetching, so concurrent requests and failures do not retry at once
+        recently_refreshed[symbol] = True
+    return ingest_symbol(symbol, fetch)
+
+
+def query_bars(symbol, start=None, end=None):
+    """Range-scan stored bars for symbol, oldest first, in the provider's JSON shape."""
+    stmt = select(
+        PriceBar.date, PriceBar.open, PriceBar.high, PriceBar.low, PriceBar.close, PriceBar.volume
+    ).where(PriceBar.symbol == symbol.upper())
+    if start is not None:
+        stmt = stmt.where(PriceBar.date >= start)
+    if end is not None:
+        stmt = stmt.where(PriceBar.date <= end)
+
+    return [
+        {'date': to_epoch(day), 'open': o, 'high': h, 'low': l, 'close': c, 'volume': v}
+        for day, o, h, l, c, v in db.session.execute(stmt.order_by(PriceBar.date))
+    ]
+
+
+def load_bars(symbol, fetch, start=None, end=None):
+    """Gap-fill symbol from the provider if needed, then serve the range from the database."""
+    ingest_symbol(symbol, fetch, start, end)
+    return query_bars(symbol, start, end)
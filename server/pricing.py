@@ -0,0 +1,65 @@
+# Standard library imports
+import math
+
+# Remote library imports
+from sqlalchemy import select, update
+
+# Local imports
+from config import db
+from models import Stock, Portfolio
+import data_versions
+import order_book
+import portfolio_summary
+
+
+def valid_price(price):
+    """Whether price is a positive, finite number; JSON true is not a price."""
+    return isinstance(price, (int, float)) and not isinstance(price, bool) and math.isfinite(price) and price > 0
+
+
+def coalesce_ticks(ticks):
+    """Collapse a tick stream to the last price seen per symbol."""
+    prices = {}
+    for tick in ticks:
+        prices[tick['symbol']] = tick['price']
+    return prices
+
+
+def revalue_portfolios(stock_ids):
+    """Revalue every holding of the given stocks at their current price with one UPDATE."""
+    portfolio_summary.record_revaluation(stock_ids)
+    price = select(Stock.current_price).where(Stock.id == Portfolio.stock_id).scalar_subquery()
+    db.session.execute(
+        update(Portfolio)
+        .where(Portfolio.stock_id.in_(stock_ids))
+        .values(
+            current_value=Portfolio.quantity * price,
+            net_profit_loss=(price - Portfolio.avg_buy_price) * Portfolio.quantity
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def apply_prices(prices):
+    """Set new prices for {symbol: price} and revalue affected holdings.
+
+    Stocks are updated with a single executemany and holdings with a single
+    set-based UPDATE. Resting limit orders the new prices cross are filled in
+    the same transaction, so this runs inside order_book.transaction(). Does
+    not commit. Returns (symbols that were not found, limit orders cancelled
+    because they could no longer be filled).
+    """
+    stocks = dict(
+        db.session.query(Stock.symbol, Stock.id).filter(Stock.symbol.in_(prices)).all()
+    )
+    if stocks:
+        db.session.execute(
+            update(Stock),
+            [{'id': stock_id, 'current_price': prices[symbol]} for symbol, stock_id in stocks.items()]
+        )
+        revalue_portfolios(list(stocks.values()))
+        data_versions.bump(data_versions.STOCKS)
+        _, rejected = order_book.match_prices({stock_id: prices[symbol] for symbol, stock_id in stocks.items()})
+    else:
+        rejected = []
+    return [symbol for symbol in prices if symbol not in stocks], rejected
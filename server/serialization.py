@@ -0,0 +1,81 @@
+# Standard library imports
+import json
+import math
+from datetime import date, datetime
+
+# Remote library imports
+from flask import current_app, make_response
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(data, pretty=False):
+    """Encode data as compact (or indented) UTF-8 JSON bytes.
+
+    Uses orjson when it is installed and the standard library otherwise; both
+    encode datetimes as ISO 8601 strings and NaN and infinities as null.
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, option=option)
+    # The standard library writes NaN as a bare NaN token, which is not JSON
+    data = _finite(data)
+    if pretty:
+        return json.dumps(data, indent=2, default=_default, allow_nan=False).encode()
+    return json.dumps(data, separators=(',', ':'), default=_default, allow_nan=False).encode()
+
+
+def loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if hasattr(value, 'tolist'):  # numpy scalars and arrays
+        return _finite(value.tolist())
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _finite(value):
+    """value with every NaN or infinite float in it, however nested, replaced by None."""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(item) for item in value]
+    return value
+
+
+class FastJSONProvider(JSONProvider):
+    """app.json provider (jsonify, request.get_json) backed by dumps/loads above.
+
+    Output is compact unless compact is set to False.
+    """
+    compact = True
+    mimetype = 'application/json'
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj, pretty=not self.compact).decode()
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj, pretty=not self.compact), mimetype=self.mimetype)
+
+
+def output_json(data, code, headers=None):
+    """flask_restful representation for application/json, using the same encoder as jsonify."""
+    response = make_response(dumps(data, pretty=not current_app.json.compact), code)
+    response.mimetype = 'application/json'
+    response.headers.extend(headers or {})
+    return response
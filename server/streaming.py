@@ -0,0 +1,160 @@
+# Standard library imports
+import threading
+from collections import defaultdict
+
+# Remote library imports
+from sqlalchemy import select
+
+# Local imports
+from config import db
+from models import Stock, Portfolio, PortfolioSummary
+import portfolio_summary
+import serialization
+
+# An idle stream sends a comment this often, so proxies keep it open and
+# disconnected clients are noticed
+HEARTBEAT_SECONDS = 15
+MAX_SYMBOLS = 500
+
+
+class Subscriber:
+    """One open stream.
+
+    Pending events are keyed, and a newer event replaces an undelivered one
+    with the same key, so a slow client only ever holds the latest price per
+    symbol and the latest portfolio totals.
+    """
+
+    def __init__(self, user_id, symbols):
+        self.user_id = user_id
+        self.symbols = symbols
+        self.pending = {}
+        self.ready = threading.Condition()
+
+    def push(self, key, event, data):
+        with self.ready:
+            self.pending[key] = (event, data)
+            self.ready.notify()
+
+    def wait(self, timeout):
+        """Block until events are pending or timeout passes; returns and clears them."""
+        with self.ready:
+            if not self.pending:
+                self.ready.wait(timeout)
+            events, self.pending = list(self.pending.values()), {}
+        return events
+
+
+class Broker:
+    """In-process fan-out from publishers to the open streams, indexed by symbol and by user."""
+
+    def __init__(self):
+        self.by_symbol = defaultdict(set)
+        self.by_user = defaultdict(set)
+        self.lock = threading.Lock()
+
+    def subscribe(self, user_id, symbols):
+        subscriber = Subscriber(user_id, symbols)
+        with self.lock:
+            for symbol in symbols:
+                self.by_symbol[symbol].add(subscriber)
+            self.by_user[user_id].add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            for symbol in subscriber.symbols:
+                self._discard(self.by_symbol, symbol, subscriber)
+            self._discard(self.by_user, subscriber.user_id, subscriber)
+
+    def publish_price(self, symbol, data):
+        with self.lock:
+            subscribers = list(self.by_symbol.get(symbol, ()))
+        for subscriber in subscribers:
+            subscriber.push(('price', symbol), 'price', data)
+
+    def publish_portfolio(self, user_id, data):
+        with self.lock:
+            subscribers = list(self.by_user.get(user_id, ()))
+        for subscriber in subscribers:
+            subscriber.push('portfolio', 'portfolio', data)
+
+    def users(self):
+        with self.lock:
+            return list(self.by_user)
+
+    @staticmethod
+    def _discard(index, key, subscriber):
+        subscribers = index.get(key)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del index[key]
+
+
+broker = Broker()
+
+
+def subscribe(user_id, symbols):
+    """Open a subscription and queue a snapshot of the current prices and portfolio totals."""
+    symbols = {symbol.upper() for symbol in symbols}
+    subscriber = broker.subscribe(user_id, symbols)
+    for symbol, price in db.session.execute(
+        select(Stock.symbol, Stock.current_price).where(Stock.symbol.in_(symbols))
+    ):
+        subscriber.push(('price', symbol), 'price', {'symbol': symbol, 'price': price})
+    summary = db.session.get(PortfolioSummary, user_id)
+    if summary is not None:
+        subscriber.push('portfolio', 'portfolio', portfolio_summary.to_dict(summary))
+    return subscriber
+
+
+def unsubscribe(subscriber):
+    """Close a subscription; safe to call more than once."""
+    broker.unsubscribe(subscriber)
+
+
+def events(subscriber):
+    """Yield the subscriber's events as Server-Sent Events.
+
+    Does not touch the database, so an idle stream holds no session or
+    connection. The caller unsubscribes when the response closes: a generator
+    that is never iterated (a HEAD request, a client gone before the first
+    chunk) never runs its own cleanup.
+    """
+    yield f"retry: {HEARTBEAT_SECONDS * 1000}\n\n"
+    while True:
+        pending = subscriber.wait(HEARTBEAT_SECONDS)
+        if not pending:
+            yield ": keep-alive\n\n"
+        for event, data in pending:
+            yield f"event: {event}\ndata: {serialization.dumps(data).decode()}\n\n"
+
+
+def publish_prices(prices):
+    """Push committed {symbol: price} changes, then the new totals of subscribed holders."""
+    for symbol, price in prices.items():
+        broker.publish_price(symbol.upper(), {'symbol': symbol.upper(), 'price': price})
+
+    users = broker.users()
+    if prices and users:
+        holders = (
+            select(Portfolio.user_id)
+            .join(Stock, Stock.id == Portfolio.stock_id)
+            .where(Stock.symbol.in_(list(prices)))
+        )
+        _publish_summaries(
+            select(PortfolioSummary).where(PortfolioSummary.user_id.in_(users), PortfolioSummary.user_id.in_(holders))
+        )
+
+
+def publish_portfolios(user_ids):
+    """Push the committed totals of whichever of user_ids have an open stream."""
+    users = set(user_ids) & set(broker.users())
+    if users:
+        _publish_summaries(select(PortfolioSummary).where(PortfolioSummary.user_id.in_(users)))
+
+
+def _publish_summaries(query):
+    for summary in db.session.execute(query).scalars():
+        broker.publish_portfolio(summary.user_id, portfolio_summary.to_dict(summary))
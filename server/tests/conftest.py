@@ -0,0 +1,78 @@
+# Standard library imports
+import os
+import sys
+import tempfile
+
+# Remote library imports
+import pytest
+from sqlalchemy import event
+
+# The app reads its configuration on import, so point it at a scratch
+# database before anything imports config
+_scratch = tempfile.mkdtemp()
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_scratch, 'test.db')}"
+os.environ.pop('DATABASE_REPLICA_URL', None)
+os.environ.setdefault('SECRET_KEY', 'test-secret')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Local imports
+import app as app_module
+from config import db
+from models import Stock, User
+import order_book
+
+STOCKS = [('AAPL', 'Apple Inc', 100.0), ('GOOGL', 'Alphabet Inc', 50.0), ('SPY', 'SPDR S&P 500 ETF', 400.0)]
+
+
+@pytest.fixture
+def app():
+    """The app with a freshly created schema, a user and a few stocks."""
+    flask_app = app_module.app
+    with flask_app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.add(User(first_name='Test', last_name='User', username='tester',
+                            email='tester@example.com', password_hash='x'))
+        db.session.add_all(Stock(symbol=symbol, company_name=name, current_price=price)
+                           for symbol, name, price in STOCKS)
+        db.session.commit()
+        yield flask_app
+        db.session.remove()
+    order_book.books.clear()
+    order_book.orders.clear()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def user(app):
+    return db.session.execute(db.select(User)).scalar_one()
+
+
+@pytest.fixture
+def headers(user):
+    return {'x-access-token': app_module.create_token(user)}
+
+
+@pytest.fixture
+def stocks(app):
+    return db.session.execute(db.select(Stock).order_by(Stock.id)).scalars().all()
+
+
+@pytest.fixture
+def statements(app):
+    """SQL statements run on any engine while the test runs, in order."""
+    seen = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        seen.append(statement)
+
+    engines = list(db.engines.values())
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', record)
+    yield seen
+    for engine in engines:
+        event.remove(engine, 'before_cursor_execute', record)
@@ -0,0 +1,53 @@
+"""Historical bars cache: fresh, revalidated and stale-if-error entries."""
+# Standard library imports
+from datetime import datetime, timedelta
+
+# Remote library imports
+import pytest
+
+# Local imports
+import historical_cache
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    historical_cache.memory_cache.clear()
+    yield
+    historical_cache.memory_cache.clear()
+
+
+def age(symbol, seconds):
+    """Backdate the cached entry for symbol by seconds."""
+    key = historical_cache.cache_key(symbol)
+    fetched_at, bars = historical_cache.memory_cache[key]
+    historical_cache.memory_cache[key] = (fetched_at - timedelta(seconds=seconds), bars)
+
+
+def test_fresh_entry_is_served_without_fetching():
+    historical_cache.get_bars('AAPL', lambda: ['first'])
+    bars, _ = historical_cache.get_bars('AAPL', lambda: pytest.fail("fetched a fresh entry"))
+    assert bars == ['first']
+
+
+def test_entry_past_stale_seconds_is_refetched():
+    historical_cache.get_bars('AAPL', lambda: ['first'])
+    age('AAPL', historical_cache.STALE_SECONDS + 1)
+    bars, fetched_at = historical_cache.get_bars('AAPL', lambda: ['second'])
+    assert bars == ['second']
+    assert datetime.utcnow() - fetched_at < timedelta(minutes=1)
+
+
+def test_stale_entry_is_served_when_refetch_fails():
+    historical_cache.get_bars('AAPL', lambda: ['first'])
+    age('AAPL', historical_cache.STALE_SECONDS + 1)
+
+    def fail():
+        raise RuntimeError("provider down")
+
+    bars, fetched_at = historical_cache.get_bars('AAPL', fail)
+    assert bars == ['first']
+    assert (datetime.utcnow() - fetched_at).total_seconds() >= historical_cache.STALE_SECONDS
+
+
+def test_cache_outlives_stale_seconds():
+    assert historical_cache.memory_cache.ttl > historical_cache.STALE_SECONDS
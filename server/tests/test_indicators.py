@@ -0,0 +1,79 @@
+"""The cached indicator state must match a rebuild from the stored bars."""
+# Standard library imports
+from datetime import date, timedelta
+
+# Remote library imports
+import pytest
+
+# Local imports
+from config import db
+from models import PriceBar
+import indicators
+
+
+def store(days):
+    db.session.add_all(
+        PriceBar(symbol='AAPL', date=day, open=price, high=price + 1, low=price - 1, close=price, volume=1000 + i)
+        for i, (day, price) in enumerate(days)
+    )
+    db.session.commit()
+
+
+def flat(values, prefix=''):
+    """Indicator values as {dotted name: number}, for approximate comparison."""
+    if isinstance(values, dict):
+        return {name: value for key, item in values.items() for name, value in flat(item, f"{prefix}{key}.").items()}
+    return {prefix: values}
+
+
+def matches(result, expected):
+    result, expected = flat(result), flat(expected)
+    return result.keys() == expected.keys() and all(result[key] == pytest.approx(expected[key]) for key in expected)
+
+
+def rebuilt():
+    indicators.states.clear()
+    return indicators.latest('AAPL')
+
+
+@pytest.fixture(autouse=True)
+def clear_states():
+    indicators.states.clear()
+    yield
+    indicators.states.clear()
+
+
+def bars(start, count):
+    return [(start + timedelta(days=i), 100.0 + (i * 7 % 13) - (i % 5)) for i in range(count)]
+
+
+def test_new_bars_are_folded_in(app):
+    history = bars(date(2024, 1, 1), 120)
+    store(history[:100])
+    indicators.latest('AAPL')
+    store(history[100:])
+    assert matches(indicators.latest('AAPL'), rebuilt())
+
+
+def test_filled_gap_rebuilds_the_state(app):
+    history = bars(date(2024, 1, 1), 120)
+    store(history[:60] + history[70:])
+    cached = indicators.latest('AAPL')
+    cached_state = indicators.states['AAPL']
+    store(history[60:70])
+    expected = rebuilt()
+    assert not matches(cached, expected)
+    indicators.states['AAPL'] = cached_state
+    assert matches(indicators.latest('AAPL'), expected)
+
+
+def test_older_backfill_rebuilds_the_state(app):
+    history = bars(date(2024, 1, 1), 120)
+    store(history[30:])
+    cached = indicators.latest('AAPL')
+    cached_state = indicators.states['AAPL']
+    store(history[:30])
+    expected = rebuilt()
+    assert not matches(cached, expected)
+    indicators.states['AAPL'] = cached_state
+    assert matches(indicators.latest('AAPL'), expected)
@@ -0,0 +1,209 @@
+"""Market-data client against a stub provider: retries, single-flight and the circuit breaker."""
+# Standard library imports
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Remote library imports
+import pytest
+
+# Local imports
+import market_data
+
+QUOTE = {'quoteResponse': {'result': [{'regularMarketPrice': 123.5}]}}
+
+
+class StubProvider:
+    """HTTP server answering each request with the next queued (status, body, delay)."""
+
+    def __init__(self):
+        self.responses = []
+        self.requests = 0
+        self.received = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with lock:
+                    stub.requests += 1
+                    status, body, delay = stub.responses.pop(0) if stub.responses else (200, QUOTE, 0)
+                stub.received.set()
+                stub.release.wait(5)
+                time.sleep(delay)
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, args=(0.01,), daemon=True).start()
+
+    def queue(self, *statuses, delay=0):
+        self.responses.extend((status, QUOTE if status == 200 else {}, delay) for status in statuses)
+
+
+@pytest.fixture
+def provider():
+    stub = StubProvider()
+    yield stub
+    stub.release.set()
+    stub.server.shutdown()
+    stub.server.server_close()
+
+
+def make_client(provider, retries=0, **breaker):
+    breaker = market_data.CircuitBreaker(**{'failure_threshold': 2, 'reset_timeout': 60, **breaker})
+    return market_data.MarketDataClient(
+        provider.url, 'key', 'host', read_timeout=2, retries=retries, backoff=0, breaker=breaker
+    )
+
+
+def test_retries_5xx_then_succeeds(provider):
+    provider.queue(503, 502)
+    client = make_client(provider, retries=2)
+    assert client.get_quote('AAPL') == 123.5
+    assert provider.requests == 3
+
+
+def test_does_not_retry_4xx(provider):
+    provider.queue(404)
+    client = make_client(provider, retries=2)
+    with pytest.raises(market_data.MarketDataError):
+        client.get_quote('AAPL')
+    assert provider.requests == 1
+
+
+def test_4xx_does_not_open_the_breaker(provider):
+    provider.queue(404, 400, 403)
+    client = make_client(provider)
+    for _ in range(3):
+        with pytest.raises(market_data.MarketDataError) as error:
+            client.get_quote('AAPL')
+        assert not isinstance(error.value, market_data.ProviderUnavailable)
+    assert provider.requests == 3
+    assert client.get_quote('AAPL') == 123.5
+
+
+@pytest.mark.parametrize('status', [429, 500, 503])
+def test_upstream_failures_open_the_breaker(provider, status):
+    provider.queue(status, status)
+    client = make_client(provider)
+    for _ in range(2):
+        with pytest.raises(market_data.UpstreamFailure):
+            client.get_quote('AAPL')
+    with pytest.raises(market_data.ProviderUnavailable):
+        client.get_quote('AAPL')
+    assert provider.requests == 2
+
+
+def test_connection_errors_open_the_breaker(provider):
+    client = make_client(provider)
+    provider.server.shutdown()
+    provider.server.server_close()
+    for _ in range(2):
+        with pytest.raises(market_data.UpstreamFailure):
+            client.get_quote('AAPL')
+    with pytest.raises(market_data.ProviderUnavailable):
+        client.get_quote('AAPL')
+
+
+def test_slow_calls_open_the_breaker(provider):
+    provider.queue(200, 200, delay=0.1)
+    client = make_client(provider, slow_call_seconds=0.05)
+    assert client.get_quote('AAPL') == 123.5
+    assert client.get_quote('AAPL') == 123.5
+    with pytest.raises(market_data.ProviderUnavailable):
+        client.get_quote('AAPL')
+
+
+def test_half_open_trial_closes_or_reopens(provider):
+    provider.queue(503, 503, 503)
+    client = make_client(provider, reset_timeout=0.1)
+    for _ in range(2):
+        with pytest.raises(market_data.UpstreamFailure):
+            client.get_quote('AAPL')
+
+    # A failed trial re-opens the breaker for another reset_timeout
+    time.sleep(0.15)
+    with pytest.raises(market_data.UpstreamFailure):
+        client.get_quote('AAPL')
+    with pytest.raises(market_data.ProviderUnavailable):
+        client.get_quote('AAPL')
+
+    # A successful trial closes it
+    time.sleep(0.15)
+    assert client.get_quote('AAPL') == 123.5
+    assert client.get_quote('AAPL') == 123.5
+    assert provider.requests == 5
+
+
+def test_half_open_lets_one_trial_through():
+    breaker = market_data.CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.before_call()
+    breaker.after_call(0, failed=True)
+    with pytest.raises(market_data.ProviderUnavailable):
+        breaker.before_call()
+
+    time.sleep(0.06)
+    breaker.before_call()
+    with pytest.raises(market_data.ProviderUnavailable):
+        breaker.before_call()
+    # The trial's outcome frees the slot, whichever way it went
+    breaker.after_call(0, failed=False)
+    breaker.before_call()
+    breaker.before_call()
+
+
+def test_single_flight_shares_one_request(provider):
+    provider.release.clear()
+    client = make_client(provider)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(client.get_quote('AAPL'))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    assert provider.received.wait(5)
+    time.sleep(0.1)
+    provider.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == [123.5] * 8
+    assert provider.requests == 1
+    assert client._inflight == {}
+
+
+def test_single_flight_shares_the_error(provider):
+    provider.queue(404)
+    provider.release.clear()
+    client = make_client(provider)
+    errors = []
+
+    def call():
+        try:
+            client.get_quote('AAPL')
+        except market_data.MarketDataError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    assert provider.received.wait(5)
+    time.sleep(0.1)
+    provider.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(errors) == 4
+    assert provider.requests == 1
+    # The next call goes upstream again
+    assert client.get_quote('AAPL') == 123.5
@@ -0,0 +1,34 @@
+"""Limit orders: malformed requests get a 400."""
+# Remote library imports
+import pytest
+
+
+def order(stock_id, **fields):
+    return {'stock_id': stock_id, 'side': 'buy', 'quantity': 1, 'limit_price': 100.0, **fields}
+
+
+@pytest.mark.parametrize('fields', [
+    {'limit_price': 'abc'}, {'limit_price': True}, {'limit_price': float('inf')}, {'limit_price': -1},
+    {'limit_price': None}, {'quantity': True}, {'quantity': 1.5}, {'quantity': '1'}, {'side': 'hold'},
+])
+def test_order_rejects_invalid_fields(client, headers, stocks, fields):
+    response = client.post('/api/orders', json=order(stocks[0].id, **fields), headers=headers)
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('body', [None, [1], 'order'])
+def test_order_rejects_non_object_body(client, headers, body):
+    assert client.post('/api/orders', json=body, headers=headers).status_code == 400
+
+
+@pytest.mark.parametrize('stock_id', [[1], {'id': 1}, '1'])
+def test_order_rejects_non_integer_stock_id(client, headers, stock_id):
+    response = client.post('/api/orders', json=order(stock_id), headers=headers)
+    assert response.status_code == 400
+    assert response.get_json() == {'error': "Invalid stock id."}
+
+
+def test_valid_order_rests(client, headers, stocks):
+    response = client.post('/api/orders', json=order(stocks[0].id, limit_price=90), headers=headers)
+    assert response.status_code == 201
+    assert response.get_json()['order']['quantity'] == 1
@@ -0,0 +1,71 @@
+"""Gap-filling asks the provider once per symbol and only for what is missing."""
+# Remote library imports
+import pytest
+
+# Local imports
+from config import db
+from models import PriceBar
+import price_bars
+
+
+@pytest.fixture(autouse=True)
+def clear_throttle():
+    price_bars.recently_asked.clear()
+    yield
+    price_bars.recently_asked.clear()
+
+
+def weekdays(count):
+    """The last count completed weekday sessions, oldest first."""
+    days, day = [], price_bars.utc_today()
+    while len(days) < count:
+        day = price_bars.last_session(day)
+        days.append(day)
+    return days[::-1]
+
+
+class Provider:
+    """A fetch stub serving a full weekday history, filtered like fetch_historical_prices."""
+
+    def __init__(self, days):
+        self.bars = [{'date': price_bars.to_epoch(day), 'close': 100.0 + i} for i, day in enumerate(days)]
+        self.calls = []
+
+    def __call__(self, symbol, start, end):
+        self.calls.append((start, end))
+        return [bar for bar in self.bars if start <= bar['date'] <= end]
+
+
+def stored():
+    return db.session.execute(db.select(PriceBar.date).order_by(PriceBar.date)).scalars().all()
+
+
+def test_several_gaps_cost_one_provider_call(app):
+    days = weekdays(60)
+    gaps = [days[5:10], days[20:25], days[40:44]]
+    missing = {day for gap in gaps for day in gap} | set(days[-3:])
+    db.session.add_all(PriceBar(symbol='AAPL', date=day, close=1.0) for day in days if day not in missing)
+    db.session.commit()
+
+    provider = Provider(days)
+    assert price_bars.ingest_symbol('AAPL', provider, days[0]) == len(missing)
+    assert len(provider.calls) == 1
+    assert stored() == days
+
+    assert price_bars.ingest_symbol('AAPL', provider, days[0]) == 0
+    assert len(provider.calls) == 1
+
+
+def test_short_gaps_are_taken_for_holidays(app):
+    days = weekdays(30)
+    holiday = days[10]
+    db.session.add_all(PriceBar(symbol='AAPL', date=day, close=1.0) for day in days if day != holiday)
+    db.session.commit()
+    assert price_bars.missing_ranges('AAPL', days[0]) == []
+
+
+def test_empty_ranges_are_not_asked_again(app):
+    provider = Provider([])
+    price_bars.ingest_symbol('ZZZZ', provider)
+    price_bars.ingest_symbol('ZZZZ', provider)
+    assert len(provider.calls) == 1
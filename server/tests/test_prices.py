@@ -0,0 +1,26 @@
+"""Malformed price updates get a 400 and change nothing."""
+# Remote library imports
+import pytest
+
+# Local imports
+from config import db
+from models import Stock
+
+
+@pytest.mark.parametrize('body', [
+    None, [1], ['AAPL'], {'symbol': 'AAPL', 'latest_price': 'abc'}, {'symbol': 'AAPL', 'latest_price': -5},
+    {'symbol': 'AAPL', 'latest_price': float('nan')}, {'symbol': 'AAPL', 'latest_price': True},
+    {'symbol': ['AAPL'], 'latest_price': 10}, [{'symbol': 'AAPL', 'latest_price': 10}, {'symbol': 'GOOGL'}],
+])
+def test_price_update_rejects_malformed_items(client, headers, stocks, body):
+    response = client.post('/api/update_stock_price', json=body, headers=headers)
+    assert response.status_code == 400
+    assert db.session.get(Stock, stocks[0].id).current_price == 100
+
+
+def test_price_update_applies_a_list(client, headers, stocks):
+    body = [{'symbol': 'AAPL', 'latest_price': 110}, {'symbol': 'GOOGL', 'latest_price': 55.5}]
+    response = client.post('/api/update_stock_price', json=body, headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()['updated'] == 2
+    assert db.session.get(Stock, stocks[0].id).current_price == 110
@@ -0,0 +1,43 @@
+"""The list endpoints must not lazy-load a Stock per row."""
+# Local imports
+from config import db
+from models import Stock
+import trade_service
+
+
+def add_holdings(user_id, count):
+    """Buy one share in each of count new stocks."""
+    offset = db.session.execute(db.select(db.func.count(Stock.id))).scalar_one()
+    new_stocks = [Stock(symbol=f"T{offset + i}", company_name=f"Test {offset + i}", current_price=10.0)
+                  for i in range(count)]
+    db.session.add_all(new_stocks)
+    db.session.flush()
+    for stock in new_stocks:
+        trade_service.execute_trade(user_id, stock.id, 'buy', 1)
+    db.session.commit()
+
+
+def statements_for(client, headers, statements, url, rows):
+    del statements[:]
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    assert len(response.get_json()) == rows
+    return len(statements)
+
+
+def test_portfolio_query_count_does_not_grow_with_holdings(client, headers, user, statements):
+    add_holdings(user.id, 2)
+    few = statements_for(client, headers, statements, '/api/portfolio', 2)
+    add_holdings(user.id, 20)
+    many = statements_for(client, headers, statements, '/api/portfolio', 22)
+    assert many == few
+    assert few <= 3
+
+
+def test_trades_query_count_does_not_grow_with_trades(client, headers, user, statements):
+    add_holdings(user.id, 2)
+    few = statements_for(client, headers, statements, '/api/trades', 2)
+    add_holdings(user.id, 20)
+    many = statements_for(client, headers, statements, '/api/trades', 22)
+    assert many == few
+    assert few <= 3
@@ -0,0 +1,48 @@
+"""Each hot query must be answered from an index, not a table scan."""
+# Standard library imports
+from datetime import date
+
+# Remote library imports
+import pytest
+from sqlalchemy import select, update
+
+# Local imports
+from config import db
+from models import Portfolio, PriceBar, Trade
+import app as app_module
+
+HOT_QUERIES = {
+    'portfolio list': (app_module.PORTFOLIO_PROJECTION, {'user_id': 1}, 'ix_portfolios_user_id_stock_id'),
+    'trade history': (app_module.TRADES_PROJECTION, {'user_id': 1}, 'ix_trades_user_id_timestamp'),
+    'successful stocks': (app_module.SUCCESSFUL_STOCKS_PROJECTION, {'threshold': 10}, 'ix_portfolios_quantity'),
+    'position lookup': (
+        select(Portfolio.quantity).where(Portfolio.user_id == 1, Portfolio.stock_id == 1),
+        {}, 'ix_portfolios_user_id_stock_id'
+    ),
+    'revalue holdings': (
+        update(Portfolio).where(Portfolio.stock_id == 1).values(current_value=Portfolio.quantity * 2.0),
+        {}, 'ix_portfolios_stock_id'
+    ),
+    'trades of a stock': (select(Trade.id).where(Trade.stock_id == 1), {}, 'ix_trades_stock_id'),
+    'stored bars': (
+        select(PriceBar.date).where(PriceBar.symbol == 'AAPL', PriceBar.date.between(date(2024, 1, 1), date(2024, 12, 31))),
+        {}, 'ix_price_bars_symbol_date'
+    ),
+}
+
+
+def query_plan(stmt, params):
+    """The detail lines of SQLite's EXPLAIN QUERY PLAN for stmt."""
+    compiled = stmt.compile(dialect=db.engine.dialect)
+    values = {**compiled.params, **params}
+    rows = db.session.connection().exec_driver_sql(
+        "EXPLAIN QUERY PLAN " + str(compiled), tuple(values[name] for name in compiled.positiontup)
+    ).all()
+    return [row[-1] for row in rows]
+
+
+@pytest.mark.parametrize('name', HOT_QUERIES)
+def test_hot_query_uses_index(app, name):
+    stmt, params, index = HOT_QUERIES[name]
+    plan = query_plan(stmt, params)
+    assert any(f"USING INDEX {index}" in line or f"USING COVERING INDEX {index}" in line for line in plan), plan
@@ -0,0 +1,32 @@
+"""Streams must release their subscription however the response ends."""
+# Local imports
+import streaming
+
+
+def subscriptions():
+    return sum(len(subscribers) for subscribers in streaming.broker.by_symbol.values())
+
+
+def test_head_requests_leave_no_subscribers(client, headers):
+    for _ in range(3):
+        # A WSGI server closes every response it is handed, body or not
+        with client.head('/api/stream?symbols=AAPL,SPY', headers=headers) as response:
+            assert response.status_code == 200
+    assert subscriptions() == 0
+    assert not streaming.broker.users()
+
+
+def test_closed_stream_unsubscribes(client, headers):
+    response = client.get('/api/stream?symbols=AAPL', headers=headers, buffered=False)
+    assert next(response.response) == b"retry: 15000\n\n"
+    assert subscriptions() == 1
+    response.close()
+    assert subscriptions() == 0
+
+
+def test_events_write_nan_as_null(app):
+    subscriber = streaming.Subscriber(1, {'AAPL'})
+    subscriber.push(('price', 'AAPL'), 'price', {'symbol': 'AAPL', 'price': float('nan')})
+    stream = streaming.events(subscriber)
+    next(stream)
+    assert next(stream) == 'event: price\ndata: {"symbol":"AAPL","price":null}\n\n'
@@ -0,0 +1,101 @@
+"""Concurrent trades must neither lose updates nor oversell."""
+# Standard library imports
+import threading
+import time
+
+# Remote library imports
+import pytest
+from sqlalchemy import func, select
+
+# Local imports
+from config import db
+from models import Portfolio, Trade, User
+import app as app_module
+import portfolio_summary
+
+THREADS = 8
+TRADES_PER_THREAD = 25
+
+
+def run_threads(target, count):
+    errors = []
+
+    def guarded(i):
+        try:
+            target(i)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=guarded, args=(i,)) for i in range(count)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors, errors
+    return time.perf_counter() - started
+
+
+def held(user_id, stock_id=None):
+    stmt = select(func.coalesce(func.sum(Portfolio.quantity), 0)).where(Portfolio.user_id == user_id)
+    if stock_id is not None:
+        stmt = stmt.where(Portfolio.stock_id == stock_id)
+    return db.session.execute(stmt).scalar_one()
+
+
+def test_concurrent_buys_are_all_applied(app, user, headers, stocks):
+    other = User(first_name='Other', last_name='User', username='other', email='other@example.com', password_hash='x')
+    db.session.add(other)
+    db.session.commit()
+    tokens = [headers, {'x-access-token': app_module.create_token(other)}]
+    user_ids, stock_ids = (user.id, other.id), [stocks[0].id, stocks[1].id]
+
+    def buy(i):
+        client = app.test_client()
+        for n in range(TRADES_PER_THREAD):
+            # Singles and batches, on the same and on different positions
+            order = {'stock_id': stock_ids[n % 2], 'trade_type': 'buy', 'quantity': 1}
+            if i < 2:
+                response = client.post('/api/trades/batch', json={'orders': [order]}, headers=tokens[i % 2])
+            else:
+                response = client.post('/api/trades', json=order, headers=tokens[i % 2])
+            assert response.status_code in (200, 201), response.get_json()
+
+    elapsed = run_threads(buy, THREADS)
+    db.session.remove()
+
+    for user_id in user_ids:
+        traded = db.session.execute(select(func.sum(Trade.quantity)).where(Trade.user_id == user_id)).scalar_one()
+        assert traded == held(user_id) == THREADS // 2 * TRADES_PER_THREAD
+    assert portfolio_summary.check_summaries() == []
+    print(f"{THREADS * TRADES_PER_THREAD / elapsed:.0f} trades/s over {THREADS} threads")
+
+
+def test_concurrent_sells_never_oversell(app, user, headers, stocks):
+    user_id, stock_id = user.id, stocks[0].id
+    client = app.test_client()
+    assert client.post('/api/trades', json={'stock_id': stock_id, 'trade_type': 'buy', 'quantity': 10},
+                       headers=headers).status_code == 201
+    statuses = []
+
+    def sell(i):
+        response = app.test_client().post(
+            '/api/trades', json={'stock_id': stock_id, 'trade_type': 'sell', 'quantity': 1}, headers=headers
+        )
+        statuses.append(response.status_code)
+
+    run_threads(sell, 20)
+    db.session.remove()
+
+    assert statuses.count(201) == 10
+    assert statuses.count(400) == 10
+    assert held(user_id, stock_id) == 0
+    assert portfolio_summary.check_summaries() == []
+
+
+@pytest.mark.parametrize('quantity', ['5', 1.5, None, 0, -1, True])
+def test_trade_rejects_invalid_quantity(client, headers, stocks, quantity):
+    response = client.post('/api/trades', json={'stock_id': stocks[0].id, 'trade_type': 'buy', 'quantity': quantity},
+                           headers=headers)
+    assert response.status_code == 400
+    assert response.get_json() == {'error': "Quantity must be positive."}
@@ -0,0 +1,43 @@
+"""Malformed trade requests get a 400, never a 500."""
+# Remote library imports
+import pytest
+
+
+@pytest.mark.parametrize('body', [[{'stock_id': 1, 'trade_type': 'buy', 'quantity': 1}], None, 'orders', {'orders': []}])
+def test_batch_rejects_malformed_body(client, headers, body):
+    response = client.post('/api/trades/batch', json=body, headers=headers)
+    assert response.status_code == 400
+    assert response.get_json() == {'error': "A list of orders is required"}
+
+
+def test_batch_rejects_non_integer_stock_ids_per_order(client, headers, stocks):
+    orders = [
+        {'stock_id': [stocks[0].id], 'trade_type': 'buy', 'quantity': 1},
+        {'stock_id': {'id': stocks[0].id}, 'trade_type': 'buy', 'quantity': 1},
+        {'stock_id': stocks[0].id, 'trade_type': 'buy', 'quantity': 1},
+    ]
+    response = client.post('/api/trades/batch', json={'orders': orders}, headers=headers)
+    assert response.status_code == 200
+    assert [result['status'] for result in response.get_json()['results']] == ['rejected', 'rejected', 'filled']
+    assert response.get_json()['results'][0]['error'] == "Invalid stock id."
+
+
+@pytest.mark.parametrize('stock_id', [[1], {'id': 1}, '1', True, None])
+def test_trade_rejects_non_integer_stock_id(client, headers, stock_id):
+    response = client.post('/api/trades', json={'stock_id': stock_id, 'trade_type': 'buy', 'quantity': 1},
+                           headers=headers)
+    assert response.status_code == 400
+    assert response.get_json() == {'error': "Invalid stock id."}
+
+
+@pytest.mark.parametrize('body', [None, [1], 'trade'])
+def test_trade_rejects_non_object_body(client, headers, body):
+    response = client.post('/api/trades', json=body, headers=headers)
+    assert response.status_code == 400
+
+
+def test_batch_rejects_boolean_quantity(client, headers, stocks):
+    response = client.post('/api/trades/batch', json={'orders': [
+        {'stock_id': stocks[0].id, 'trade_type': 'buy', 'quantity': True}
+    ]}, headers=headers)
+    assert response.get_json()['results'][0] == {'index': 0, 'status': 'rejected', 'error': "Quantity must be positive."}
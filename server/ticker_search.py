@@ -0,0 +1,241 @@
+# Standard library imports
+import threading
+from bisect import bisect_left, insort
+
+# Remote library imports
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+
+# Local imports
+from config import db
+from models import StockTicker
+
+MAX_RESULTS = 50
+# Longer queries are cut; company names are at most 100 characters
+MAX_QUERY_LENGTH = 100
+
+# Match tiers, best first
+EXACT, SYMBOL_PREFIX, NAME_PREFIX, WORD_PREFIX, FUZZY = range(5)
+
+# Terms shorter than this are not matched fuzzily; one edit away from a
+# two-letter symbol is half the universe
+FUZZY_MIN_LENGTH = 3
+
+# Sorted keys are "<term>\0<symbol>", so equal terms stay distinct and sort
+# next to each other
+_SEPARATOR = '\0'
+
+
+def _deletes(term):
+    """term and every string one deletion away from it."""
+    return {term} | {term[:i] + term[i + 1:] for i in range(len(term))}
+
+
+def _one_edit(a, b):
+    """Whether a and b differ by at most one insertion, deletion, substitution or adjacent transposition."""
+    if abs(len(a) - len(b)) > 1:
+        return False
+    i = 0
+    while i < min(len(a), len(b)) and a[i] == b[i]:
+        i += 1
+    return (
+        a[i + 1:] == b[i + 1:]  # substitution (or equal)
+        or a[i + 1:] == b[i:]  # deletion from a
+        or a[i:] == b[i + 1:]  # insertion into a
+        or (a[i + 1:i + 2] == b[i:i + 1] and a[i:i + 1] == b[i + 1:i + 2] and a[i + 2:] == b[i + 2:])
+    )
+
+
+class TickerIndex:
+    """In-memory typeahead index over StockTicker symbols and company names.
+
+    Prefix matches come from sorted arrays searched with bisect: symbols,
+    full lowercase names and the words of the names. Typos are matched by
+    symmetric deletion: every distinct term (symbol or name word) is stored
+    under itself and each one-deletion variant, so a query within one edit
+    (insertion, deletion, substitution or adjacent transposition) of a term
+    shares a key with it. A lookup costs a few bisects and len(query) + 1
+    dict probes, and never touches more than limit entries per array.
+    """
+
+    def __init__(self):
+        self.tickers = {}  # id -> (symbol, company_name)
+        self.by_symbol = {}  # symbol -> company_name
+        self.symbols = []
+        self.names = []
+        self.words = []
+        self.terms = {}  # symbol or name word -> number of tickers using it
+        self.variants = {}  # deletion variant -> terms that have it
+        self.lock = threading.Lock()
+        self.built = False
+
+    def build(self):
+        """(Re)load every ticker from the database."""
+        rows = db.session.execute(select(StockTicker.id, StockTicker.symbol, StockTicker.company_name)).all()
+        index = TickerIndex()
+        for ticker_id, symbol, company_name in rows:
+            index._add(ticker_id, symbol, company_name, sort=False)
+        index.symbols.sort()
+        index.names.sort()
+        index.words.sort()
+        with self.lock:
+            self.tickers, self.by_symbol = index.tickers, index.by_symbol
+            self.symbols, self.names = index.symbols, index.names
+            self.words, self.terms, self.variants = index.words, index.terms, index.variants
+            self.built = True
+
+    def apply(self, changes):
+        """Apply {ticker_id: (symbol, company_name) or None for deleted} from committed changes."""
+        with self.lock:
+            if not self.built:
+                return
+            for ticker_id, ticker in changes.items():
+                self._remove(ticker_id)
+                if ticker is not None:
+                    self._add(ticker_id, *ticker)
+
+    def search(self, query, limit=10):
+        """Up to limit {symbol, company_name} matches for query, best first.
+
+        Ranked by tier (exact symbol, symbol prefix, name prefix, prefix of
+        any word in the name, one edit from a symbol or word), then by symbol.
+        """
+        text = ' '.join(query[:MAX_QUERY_LENGTH].lower().split())
+        if not text:
+            return []
+        limit = max(1, min(limit, MAX_RESULTS))
+        matches = {}
+
+        def take(tier, symbol):
+            if symbol not in matches:
+                matches[symbol] = tier
+
+        with self.lock:
+            symbol = text.upper().replace(' ', '')
+            if symbol in self.by_symbol:
+                take(EXACT, symbol)
+            for key in self._prefixed(self.symbols, symbol, limit):
+                take(SYMBOL_PREFIX, key)
+            for tier, keys in ((NAME_PREFIX, self.names), (WORD_PREFIX, self.words)):
+                if len(matches) >= limit:
+                    break
+                for key in self._prefixed(keys, text, limit):
+                    take(tier, key.rsplit(_SEPARATOR, 1)[1])
+            if len(matches) < limit and len(text) >= FUZZY_MIN_LENGTH:
+                for query_term in {symbol.lower(), text.split()[-1]}:
+                    for key in _deletes(query_term):
+                        for term in self.variants.get(key, ()):
+                            # Both sides losing a different letter can be two edits apart
+                            if not _one_edit(query_term, term):
+                                continue
+                            if term.upper() in self.by_symbol:
+                                take(FUZZY, term.upper())
+                            for match in self._prefixed(self.words, term + _SEPARATOR, limit):
+                                take(FUZZY, match.rsplit(_SEPARATOR, 1)[1])
+            ranked = sorted(matches.items(), key=lambda match: (match[1], match[0]))[:limit]
+            return [{'symbol': match, 'company_name': self.by_symbol.get(match)} for match, _ in ranked]
+
+    @staticmethod
+    def _prefixed(keys, prefix, limit):
+        """The first limit keys starting with prefix."""
+        start = bisect_left(keys, prefix)
+        found = []
+        for key in keys[start:start + limit]:
+            if not key.startswith(prefix):
+                break
+            found.append(key)
+        return found
+
+    def _add(self, ticker_id, symbol, company_name, sort=True):
+        symbol = symbol.upper()
+        add = insort if sort else list.append
+        self.tickers[ticker_id] = (symbol, company_name)
+        self.by_symbol[symbol] = company_name
+        add(self.symbols, symbol)
+        for kind, key in self._name_keys(symbol, company_name):
+            add(self.names if kind == 'name' else self.words, key)
+        for term in self._fuzzy_terms(symbol, company_name):
+            self.terms[term] = self.terms.get(term, 0) + 1
+            if self.terms[term] == 1:
+                for variant in _deletes(term):
+                    self.variants.setdefault(variant, set()).add(term)
+
+    def _remove(self, ticker_id):
+        ticker = self.tickers.pop(ticker_id, None)
+        if ticker is None:
+            return
+        symbol, company_name = ticker
+        self.by_symbol.pop(symbol, None)
+        self._discard(self.symbols, symbol)
+        for kind, key in self._name_keys(symbol, company_name):
+            self._discard(self.names if kind == 'name' else self.words, key)
+        for term in self._fuzzy_terms(symbol, company_name):
+            self.terms[term] -= 1
+            if self.terms[term]:
+                continue
+            del self.terms[term]
+            for variant in _deletes(term):
+                terms = self.variants[variant]
+                terms.discard(term)
+                if not terms:
+                    del self.variants[variant]
+
+    @staticmethod
+    def _discard(keys, key):
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            del keys[i]
+
+    @staticmethod
+    def _name_keys(symbol, company_name):
+        words = (company_name or '').lower().split()
+        if not words:
+            return []
+        keys = [('name', ' '.join(words) + _SEPARATOR + symbol)]
+        keys += [('word', word + _SEPARATOR + symbol) for word in set(words)]
+        return keys
+
+    @staticmethod
+    def _fuzzy_terms(symbol, company_name):
+        terms = {symbol.lower()} | set((company_name or '').lower().split())
+        return {term for term in terms if len(term) >= FUZZY_MIN_LENGTH}
+
+
+index = TickerIndex()
+
+
+def search(query, limit=10):
+    """Search the shared index, building it from the database on first use."""
+    if not index.built:
+        index.build()
+    return index.search(query, limit)
+
+
+# The index follows committed StockTicker changes made through the ORM
+
+def _pending(target):
+    session = object_session(target)
+    return session.info.setdefault('ticker_changes', {}) if session is not None else {}
+
+
+@event.listens_for(StockTicker, 'after_insert')
+@event.listens_for(StockTicker, 'after_update')
+def _record_change(mapper, connection, target):
+    _pending(target)[target.id] = (target.symbol, target.company_name)
+
+
+@event.listens_for(StockTicker, 'after_delete')
+def _record_delete(mapper, connection, target):
+    _pending(target)[target.id] = None
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_committed(session):
+    changes = session.info.pop('ticker_changes', None)
+    if changes:
+        index.apply(changes)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_rolled_back(session, previous_transaction):
+    session.info.pop('ticker_changes', None)
@@ -0,0 +1,254 @@
+# Standard library imports
+from datetime import datetime
+
+# Remote library imports
+from sqlalchemy import delete, insert, select, update
+
+# Local imports
+from config import db
+from db_helpers import insert_ignoring_conflict
+from models import Stock, Portfolio, Trade
+import data_versions
+import database
+import portfolio_summary
+
+
+class TradeError(Exception):
+    """A trade that cannot be executed; status is the HTTP status to report."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def valid_quantity(quantity):
+    """Whether quantity is a positive whole number of shares; JSON true is not 1."""
+    return isinstance(quantity, int) and not isinstance(quantity, bool) and quantity > 0
+
+
+def valid_id(value):
+    """Whether value can be a primary key, so it is safe to hash and to bind."""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def execute_trade(user_id, stock_id, trade_type, quantity, price=None):
+    """Apply a buy or sell to the user's position and log it. Does not commit.
+
+    Positions are changed with single conditional UPDATE statements, so
+    concurrent trades on the same position cannot lose updates. The price
+    defaults to the stock's current price.
+    """
+    if not valid_id(stock_id):
+        raise TradeError("Invalid stock id.")
+    if trade_type not in ('buy', 'sell'):
+        raise TradeError("Invalid trade type.")
+    if not valid_quantity(quantity):
+        raise TradeError("Quantity must be positive.")
+
+    if price is None:
+        row = db.session.execute(select(Stock.current_price).where(Stock.id == stock_id)).first()
+        if row is None:
+            raise TradeError("Stock not found.", 404)
+        price = row.current_price
+
+    position = select(
+        Portfolio.quantity, Portfolio.avg_buy_price, Portfolio.current_value
+    ).where(_position(user_id, stock_id))
+    # The summary moves by after - before, so before must be read under the write lock
+    database.lock_for_write(db.session)
+    portfolio_summary.lock_summary(user_id)
+    before = db.session.execute(position.with_for_update()).first()
+
+    if trade_type == 'buy':
+        _buy(user_id, stock_id, quantity, price)
+        net_profit = 0.0
+    else:
+        net_profit = _sell(user_id, stock_id, quantity, price)
+
+    after = db.session.execute(position).first()
+    portfolio_summary.record_change(
+        user_id, [before] if before else [], [after] if after else [], net_profit
+    )
+
+    trade = Trade(
+        user_id=user_id,
+        stock_id=stock_id,
+        trade_type=trade_type,
+        quantity=quantity,
+        price_at_trade=price,
+        net_profit=net_profit,
+        timestamp=datetime.utcnow()
+    )
+    db.session.add(trade)
+    data_versions.bump(data_versions.user_key(user_id))
+    return trade
+
+
+def _position(user_id, stock_id):
+    return (Portfolio.user_id == user_id) & (Portfolio.stock_id == stock_id)
+
+
+def _buy(user_id, stock_id, quantity, price):
+    """Add to a position, averaging in the new cost, or open it."""
+    add_to_position = (
+        update(Portfolio)
+        .where(_position(user_id, stock_id))
+        .values(
+            avg_buy_price=(Portfolio.avg_buy_price * Portfolio.quantity + quantity * price)
+            / (Portfolio.quantity + quantity),
+            quantity=Portfolio.quantity + quantity,
+            current_value=(Portfolio.quantity + quantity) * price
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if db.session.execute(add_to_position).rowcount:
+        return
+
+    opened = db.session.execute(insert_ignoring_conflict(Portfolio, {
+        'user_id': user_id,
+        'stock_id': stock_id,
+        'quantity': quantity,
+        'avg_buy_price': price,
+        'initial_capital': quantity * price,
+        'current_value': quantity * price,
+        'net_profit_loss': 0.0,
+    }, ['user_id', 'stock_id']))
+    if not opened.rowcount:
+        # A concurrent buy opened the position first
+        db.session.execute(add_to_position)
+
+
+def _sell(user_id, stock_id, quantity, price):
+    """Reduce a position only if it holds enough shares; returns the realized profit."""
+    result = db.session.execute(
+        update(Portfolio)
+        .where(_position(user_id, stock_id), Portfolio.quantity >= quantity)
+        .values(
+            quantity=Portfolio.quantity - quantity,
+            net_profit_loss=Portfolio.net_profit_loss + (price - Portfolio.avg_buy_price) * quantity,
+            current_value=(Portfolio.quantity - quantity) * price
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if not result.rowcount:
+        raise TradeError("Insufficient stock quantity.")
+
+    # The row is write-locked by the UPDATE above, so this read is consistent
+    avg_buy_price = db.session.execute(
+        select(Portfolio.avg_buy_price).where(_position(user_id, stock_id))
+    ).scalar_one()
+    db.session.execute(
+        delete(Portfolio)
+        .where(_position(user_id, stock_id), Portfolio.quantity == 0)
+        .execution_options(synchronize_session=False)
+    )
+    return (price - avg_buy_price) * quantity
+
+
+def execute_batch(user_id, orders):
+    """Apply a list of {stock_id, trade_type, quantity} orders in sequence. Does not commit.
+
+    All referenced stocks and the user's positions in them are loaded up front
+    in two queries, orders are applied in memory with the same rules as
+    execute_trade, and the resulting trades are bulk-inserted. A rejected
+    order does not stop the ones after it. Returns one result per order.
+
+    The positions are read and written back whole, so the write lock and the
+    user's summary lock are taken before they are loaded; concurrent batches
+    and single trades of the same user wait instead of overwriting each other.
+    """
+    stock_ids = {order.get('stock_id') for order in orders if valid_id(order.get('stock_id'))}
+    database.lock_for_write(db.session)
+    portfolio_summary.lock_summary(user_id)
+    stocks = {stock.id: stock for stock in Stock.query.filter(Stock.id.in_(stock_ids))}
+    positions = {
+        entry.stock_id: entry
+        for entry in Portfolio.query.filter(
+            Portfolio.user_id == user_id, Portfolio.stock_id.in_(stock_ids)
+        ).with_for_update()
+    }
+    before = [
+        portfolio_summary.Position(entry.quantity, entry.avg_buy_price, entry.current_value)
+        for entry in positions.values()
+    ]
+
+    results, trades = [], []
+    realized = 0.0
+    now = datetime.utcnow()
+    for index, order in enumerate(orders):
+        stock_id, trade_type, quantity = order.get('stock_id'), order.get('trade_type'), order.get('quantity')
+        if not valid_id(stock_id):
+            results.append({'index': index, 'status': 'rejected', 'error': "Invalid stock id."})
+            continue
+        stock = stocks.get(stock_id)
+        if stock is None:
+            results.append({'index': index, 'status': 'rejected', 'error': "Stock not found."})
+            continue
+        if trade_type not in ('buy', 'sell'):
+            results.append({'index': index, 'status': 'rejected', 'error': "Invalid trade type."})
+            continue
+        if not valid_quantity(quantity):
+            results.append({'index': index, 'status': 'rejected', 'error': "Quantity must be positive."})
+            continue
+
+        price = stock.current_price
+        entry = positions.get(stock.id)
+        net_profit = 0.0
+        if trade_type == 'buy':
+            if entry is not None:
+                new_quantity = entry.quantity + quantity
+                entry.avg_buy_price = (entry.avg_buy_price * entry.quantity + quantity * price) / new_quantity
+                entry.quantity = new_quantity
+                entry.current_value = new_quantity * price
+            else:
+                entry = positions[stock.id] = Portfolio(
+                    user_id=user_id,
+                    stock_id=stock.id,
+                    quantity=quantity,
+                    avg_buy_price=price,
+                    initial_capital=quantity * price,
+                    current_value=quantity * price,
+                    net_profit_loss=0.0
+                )
+                db.session.add(entry)
+        else:
+            if entry is None or entry.quantity < quantity:
+                results.append({'index': index, 'status': 'rejected', 'error': "Insufficient stock quantity."})
+                continue
+            net_profit = (price - entry.avg_buy_price) * quantity
+            entry.quantity -= quantity
+            entry.net_profit_loss += net_profit
+            entry.current_value = entry.quantity * price
+            realized += net_profit
+
+        trades.append({
+            'user_id': user_id,
+            'stock_id': stock.id,
+            'trade_type': trade_type,
+            'quantity': quantity,
+            'price_at_trade': price,
+            'net_profit': net_profit,
+            'timestamp': now,
+        })
+        results.append({'index': index, 'status': 'filled', 'price_at_trade': price, 'net_profit': net_profit})
+
+    # Closed positions are dropped only now, so a later buy in the batch can reopen them
+    for entry in positions.values():
+        if entry.quantity == 0:
+            _discard(entry)
+    portfolio_summary.record_change(user_id, before, [
+        entry for entry in positions.values() if entry.quantity
+    ], realized)
+    if trades:
+        db.session.execute(insert(Trade), trades)
+        data_versions.bump(data_versions.user_key(user_id))
+    return results
+
+
+def _discard(entry):
+    """Drop a closed position, whether it was loaded or only just added."""
+    if entry in db.session.new:
+        db.session.expunge(entry)
+    else:
+        db.session.delete(entry)